@@ -1,8 +1,4 @@
 import os, sys, globals
-from dotenv import load_dotenv
-from modules.utils.env_checker import check_env
-from modules.kokoro import Kokoro
-from modules import queues
 
 globals.processing = True
 globals.currently_speaking = False
@@ -40,6 +36,13 @@ if __name__ == "__main__":
         check_env(): Verifica se as variáveis de ambiente estão corretamente configuradas.
         load_dotenv(): Carrega as variáveis de ambiente do arquivo .env.
     """
+    # Importados aqui: no Windows, os processos do parser de PDF reimportam este arquivo
+    # (spawn) e não devem carregar torch, onnxruntime, langchain e Chroma
+    from dotenv import load_dotenv
+    from modules.utils.env_checker import check_env
+    from modules.kokoro import Kokoro
+    from modules import queues
+
     check_env()
     load_dotenv()
 
@@ -3,10 +3,16 @@ from modules.tts.tts_base import TTSBase
 from modules.stt.stt_base import STTBase
 from modules.utils.db_utils import initialize_db, update_db
 from modules.utils.conversation_utils import load_filtered_words, load_keyword_map, save_inprogress, filter_paragraph
+from modules.utils.audio_utils import estimate_word_timings
+from modules.tts.audio_cache import AudioCache
+from modules.utils.ingestion import IngestionService
 from langchain.prompts import ChatPromptTemplate
 from colorama import *
 import tiktoken
 import globals
+import logging
+import os
+from contextlib import aclosing
 
 class Kokoro:
     """
@@ -42,6 +48,8 @@ class Kokoro:
                  GOOGLE_API_KEY=None,
                  YOUR_SEARCH_ENGINE_ID=None,
                  OPENWEATHERMAP_API_KEY=None,
+                 tts_cache=True,
+                 rag_watch=True,
                  ):
         """
         Inicializa a classe Kokoro com os parâmetros fornecidos.
@@ -56,22 +64,41 @@ class Kokoro:
             model_size (str): Tamanho do modelo STT.
             model_device (str): Dispositivo utilizado para o modelo STT.
             compute_type (str): Tipo de computação utilizada no STT.
+            tts_cache (bool): Se True, o áudio sintetizado é guardado em cache (memória e
+                disco, em `<save_folderpath>/tts_cache`) e frases repetidas tocam sem
+                chamar o modelo TTS. Só vale para provedores com `cache_identity`.
+            rag_watch (bool): Se True, o índice RAG é atualizado em segundo plano: a
+                inicialização não espera a ingestão e arquivos adicionados à pasta do
+                personagem (PDFs/ e JSON) entram no índice com o programa rodando.
         """
         self.save_folderpath = save_folderpath
+        self.host = host
         self.model = LLMMODEL
         self.llm_provider = LLMBase.get_llm_provider(llm, host, self.save_folderpath, GOOGLE_API_KEY, YOUR_SEARCH_ENGINE_ID, OPENWEATHERMAP_API_KEY)
         self.tts_provider = TTSBase.get_tts_provider(tts, tts_model)
+        self.tts_cache = None
+        # Sem cache_identity, mudar as configurações do provedor não invalidaria o cache
+        if tts_cache and hasattr(self.tts_provider, "cache_identity"):
+            identity = {"provider": tts, "model": tts_model}
+            identity.update(self.tts_provider.cache_identity())
+            self.tts_cache = AudioCache(os.path.join(self.save_folderpath, "tts_cache"), identity)
+        elif tts_cache:
+            logging.info(f"TTS provider '{tts}' does not describe its settings, audio cache disabled.")
         self.stt_provider = STTBase.get_stt_provider(stt, model_size, model_device, compute_type, wake_word)
         self.stt = stt
 
         # Inicializa o banco de dados
-        self.db = initialize_db(model=llm, host=host, save_folderpath=self.save_folderpath)
+        self.db = initialize_db(model=llm, host=host, save_folderpath=self.save_folderpath, update=not rag_watch)
+        self.ingestion = None
+        if rag_watch:
+            self.ingestion = IngestionService(self.save_folderpath, self.db.embeddings)
+            self.ingestion.start()
         # Carrega filtros
         self.filtered_words = load_filtered_words(self.save_folderpath + "/filtered_words.txt")
         self.keyword_map = load_keyword_map(self.save_folderpath + "/keyword_map.json")
         self.messages = [{}]
 
-    def query_rag(self, template, username, userprompt):
+    async def query_rag(self, template, username, userprompt):
         """OLD
         Realiza uma consulta RAG (Retrieval-Augmented Generation) usando um prompt fornecido.
 
@@ -87,7 +114,7 @@ class Kokoro:
         template = ChatPromptTemplate.from_template(template)
         prompt = template.format(username=username, memoryDB=memoryDB, messages=self.messages, userprompt=userprompt)
         self.memory_sise(prompt)
-        response = self.llm_provider.generate(prompt, self.model)
+        response = await self.llm_provider.generate(prompt, self.model)
         return response
     
     async def chat(self, userprompt):
@@ -102,6 +129,73 @@ class Kokoro:
         """
         response = self.llm_provider.chat(userprompt, self.model)
         return await response
+
+    async def chat_stream(self, userprompt, commit=True):
+        """
+        Realiza uma consulta de chat recebendo a resposta em streaming.
+
+        Args:
+            userprompt (str): Entrada do usuário para a consulta.
+            commit (bool): Se False, a resposta é especulativa e não entra no histórico
+                do provedor até `commit_turn` ser chamado.
+
+        Yields:
+            str: Trechos da resposta à medida que o modelo LLM os gera.
+        """
+        # Fecha o stream do provedor junto com este gerador (cancelamento ou barge-in)
+        async with aclosing(self.llm_provider.chat_stream(userprompt, self.model, commit=commit)) as stream:
+            async for token in stream:
+                yield token
+
+    @property
+    def supports_speculation(self):
+        """
+        Indica se o provedor LLM pode gerar uma resposta sem alterar o histórico.
+        """
+        return getattr(self.llm_provider, "supports_speculation", False)
+
+    def commit_turn(self, userprompt, response):
+        """
+        Registra no histórico do provedor LLM uma resposta especulativa aproveitada.
+
+        Args:
+            userprompt (str): Entrada do usuário.
+            response (str): Resposta do LLM que foi usada.
+        """
+        self.llm_provider.commit_turn(userprompt, response)
+
+    def set_partial_callback(self, callback):
+        """
+        Define a função chamada com cada transcrição parcial do provedor STT, se ele
+        produzir transcrições parciais.
+
+        Args:
+            callback (function): Recebe o texto parcial; é chamada fora do loop asyncio.
+
+        Returns:
+            bool: True se o provedor STT suporta transcrições parciais.
+        """
+        if not hasattr(self.stt_provider, "on_partial"):
+            return False
+        self.stt_provider.on_partial = callback
+        return True
+
+    def set_speech_callback(self, callback):
+        """
+        Define a função chamada quando o provedor STT confirma que o usuário começou a
+        falar, usada para interromper a resposta em andamento (barge-in).
+
+        Args:
+            callback (function): Recebe se a palavra-chave foi reconhecida na fala; é
+                chamada fora do loop asyncio.
+
+        Returns:
+            bool: True se o provedor STT avisa o início da fala.
+        """
+        if not hasattr(self.stt_provider, "on_speech_start"):
+            return False
+        self.stt_provider.on_speech_start = callback
+        return True
     
     async def chat_query_rag(self, template, username, userprompt):
         """
@@ -134,12 +228,89 @@ class Kokoro:
         Returns:
             str: Caminho do arquivo de áudio gerado ou o próprio áudio e a taxa de amostragem.
         """
+        if self.tts_cache and not temp_filename:
+            cached = self.tts_cache.get(sentence)
+            if cached:
+                return cached
         audio, rate = self.tts_provider.generate_speech(sentence, temp_filename)
         if temp_filename:
             return temp_filename
         else:
+            if self.tts_cache:
+                self.tts_cache.put(sentence, audio, rate)
             return audio, rate
+
+    @property
+    def batch_policy(self):
+        """
+        Política de agrupamento do provedor TTS, ou None se ele só sintetiza uma sentença por vez.
+        """
+        if hasattr(self.tts_provider, "generate_speech_batch"):
+            return getattr(self.tts_provider, "batch_policy", None)
+        return None
+
+    def generate_voice_batch(self, sentences):
+        """
+        Gera o áudio de várias sentenças, em lote quando o provedor TTS suporta.
+
+        Args:
+            sentences (list): Textos a serem convertidos em fala.
+
+        Returns:
+            list: Pares (áudio, taxa de amostragem) na mesma ordem das sentenças.
+        """
+        if not hasattr(self.tts_provider, "generate_speech_batch"):
+            return [self.generate_voice(sentence) for sentence in sentences]
+
+        voices = [self.tts_cache.get(sentence) if self.tts_cache else None for sentence in sentences]
+        missing = [i for i, voice in enumerate(voices) if voice is None]
+        if missing:
+            generated = self.tts_provider.generate_speech_batch([sentences[i] for i in missing])
+            for i, (audio, rate) in zip(missing, generated):
+                voices[i] = (audio, rate)
+                if self.tts_cache:
+                    self.tts_cache.put(sentences[i], audio, rate)
+        return voices
+
+    def word_timings(self, sentence, audio, rate):
+        """
+        Obtém o instante em que cada palavra da sentença termina no áudio gerado.
+
+        Usa o mapa do provedor TTS quando ele oferece um (durações de fonemas do Piper,
+        estimativa de duração do F5) e, caso contrário, uma estimativa proporcional.
+
+        Args:
+            sentence (str): Texto que foi sintetizado.
+            audio (np.ndarray): Áudio gerado para a sentença.
+            rate (int): Taxa de amostragem do áudio.
+
+        Returns:
+            list: Pares (palavra, amostra final) em ordem.
+        """
+        provider_timings = getattr(self.tts_provider, "word_timings", None)
+        if provider_timings:
+            return provider_timings(sentence, audio, rate)
+        return estimate_word_timings(sentence, len(audio))
         
+    def rag_status(self):
+        """
+        Retorna o estado da ingestão do índice RAG em segundo plano.
+
+        Returns:
+            dict | None: Estado, watcher em uso, atualização pendente e resultado da
+                última atualização, ou None se a ingestão em segundo plano está desligada.
+        """
+        return self.ingestion.status() if self.ingestion else None
+
+    def close(self):
+        """
+        Encerra os serviços em segundo plano. Uma atualização do índice RAG em andamento
+        termina antes, para não deixar upserts pela metade.
+        """
+        if self.ingestion:
+            self.ingestion.stop()
+            self.ingestion = None
+
     def save_conversation(self):
         """
         Salva o progresso da conversa atual no diretório especificado.
@@ -183,7 +354,10 @@ class Kokoro:
         if total_tokens >= 7500:
             print(Style.BRIGHT + Fore.YELLOW, f'\nTotal number of tokens: {total_tokens} of 8000. Resetting.')
             self.save_conversation()
-            self.db = initialize_db(self.save_folderpath)
+            # Com a ingestão em segundo plano, só ela escreve no índice e no manifesto
+            self.db = initialize_db(host=self.host, save_folderpath=self.save_folderpath, update=self.ingestion is None)
+            if self.ingestion:
+                self.ingestion.request_update()
             self.messages = [{}]
             
     def filter(self, response):
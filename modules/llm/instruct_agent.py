@@ -4,7 +4,9 @@ import os
 import requests
 import threading
 import time
+from contextlib import aclosing
 from ollama import AsyncClient, Client
+from modules.utils.http_clients import get_ollama_client, get_ollama_async_client, get_requests_session, REQUESTS_TIMEOUT
 import colorama
 from ctypes import cast, POINTER
 from comtypes import CLSCTX_ALL
@@ -13,10 +15,10 @@ import sqlite3
 import subprocess
 import tkinter as tk
 from tkinter import filedialog
-from modules.utils.conversation_utils import process_line, clean_raw_bytes, process_sentence
-import globals
+from modules.utils.conversation_utils import process_line, clean_raw_bytes
 
 from modules.llm.llm_base import LLMBase
+from modules.llm.message_builder import MessageBuilder, KEEP_ALIVE
 
 from langchain.prompts import ChatPromptTemplate
 
@@ -258,7 +260,7 @@ class LLMTOOLS:
         try:
             url = "http://api.openweathermap.org/data/2.5/forecast"
             params = {'q': city, 'appid': api_key, 'units': 'metric'}
-            response = requests.get(url, params=params)
+            response = get_requests_session().get(url, params=params, timeout=REQUESTS_TIMEOUT)
             data = response.json()
 
             if "list" in data:
@@ -285,7 +287,7 @@ class LLMTOOLS:
         try:
             url = "https://www.googleapis.com/customsearch/v1"
             params = {'key': api_key, 'cx': search_engine_id, 'q': query}
-            response = requests.get(url, params=params)
+            response = get_requests_session().get(url, params=params, timeout=REQUESTS_TIMEOUT)
             results = response.json()
 
             if 'items' in results:
@@ -341,7 +343,7 @@ class LLMTOOLS:
         """
         try:
             url = "https://v2.jokeapi.dev/joke/Any"
-            response = requests.get(url)
+            response = get_requests_session().get(url, timeout=REQUESTS_TIMEOUT)
             data = response.json()
 
             if data["type"] == "single":
@@ -370,10 +372,12 @@ class ChatAgent:
         self.GOOGLE_API_KEY = GOOGLE_API_KEY
         self.YOUR_SEARCH_ENGINE_ID = YOUR_SEARCH_ENGINE_ID
         self.OPENWEATHERMAP_API_KEY = OPENWEATHERMAP_API_KEY
-        self.client = AsyncClient(host=host)
-        self.clientsync = Client(host=host)
+        self.client = get_ollama_async_client(host)
+        self.clientsync = get_ollama_client(host)
         self.tools = tools
-        self.messages = load_messages_from_json(self.save_folderpath)
+        # Histórico com prefixo estável; self.messages é a mesma lista
+        self.history = MessageBuilder(load_messages_from_json(self.save_folderpath))
+        self.messages = self.history.messages
 
     async def get_response(self, prompt, model):
         """
@@ -386,12 +390,53 @@ class ChatAgent:
         Returns:
             dict: Resposta do LLM.
         """
-        self.messages.append({'role': 'user', 'content': prompt})
-        response = await self.client.chat(model=model, messages=self.messages)
-        self.messages.append(response['message'])
+        user_message = {'role': 'user', 'content': prompt}
+        response = await self.client.chat(model=model, messages=self.history.build(user_message), keep_alive=KEEP_ALIVE)
+        self.history.append(user_message, response['message'])
         save_messages_to_json(self.messages, self.save_folderpath)  # Salva o histórico atualizado
         return response['message']['content']
 
+    async def stream_response(self, prompt, model, commit=True):
+        """
+        Envia uma mensagem ao LLM e entrega a resposta token a token.
+
+        A resposta parcial é salva no histórico mesmo se o stream for interrompido, e o
+        stream HTTP com o servidor é fechado assim que o consumidor cancela ou fecha o gerador.
+
+        Args:
+            prompt (str): Mensagem do usuário.
+            model (str): Modelo do LLM a ser utilizado.
+            commit (bool): Se False, o histórico não é alterado; use commit_turn se a
+                resposta for aproveitada.
+
+        Yields:
+            str: Trechos da resposta do LLM.
+        """
+        messages = self.history.build({'role': 'user', 'content': prompt})
+        content = ''
+        try:
+            stream = await self.client.chat(model=model, messages=messages, stream=True, keep_alive=KEEP_ALIVE)
+            async with aclosing(stream):
+                async for chunk in stream:
+                    token = chunk['message']['content']
+                    if token:
+                        content += token
+                        yield token
+        finally:
+            if commit:
+                self.commit_turn(prompt, content)
+
+    def commit_turn(self, prompt, content):
+        """
+        Registra a mensagem do usuário e a resposta no histórico e o salva.
+
+        Args:
+            prompt (str): Mensagem do usuário.
+            content (str): Resposta do LLM.
+        """
+        self.history.append({'role': 'user', 'content': prompt}, {'role': 'assistant', 'content': content})
+        save_messages_to_json(self.messages, self.save_folderpath)  # Salva o histórico atualizado
+
     async def run_tools(self, prompt, model):
         """
         Envia um prompt ao LLM indicando que ferramentas podem ser necessárias.
@@ -405,8 +450,8 @@ class ChatAgent:
         """
         toolsmessages = [{'role': 'user', 'content': prompt}]
 
-        response = await self.client.chat(model=model, messages=toolsmessages, tools=self.tools.instruct_tools)
-        self.messages.append(response['message'])
+        response = await self.client.chat(model=model, messages=toolsmessages, tools=self.tools.instruct_tools, keep_alive=KEEP_ALIVE)
+        self.history.append(response['message'])
 
         if response['message'].get('tool_calls'):
             for tool in response['message']['tool_calls']:
@@ -424,11 +469,11 @@ class ChatAgent:
                 tool_function = self.tools.tools_mapping.get(tool_name)
                 if tool_function:
                     function_response = tool_function(**args)
-                    self.messages.append({'role': 'tool', 'content': function_response})
+                    self.history.append({'role': 'tool', 'content': function_response})
 
                 # Obtém a resposta final do LLM
-                final_response = await self.client.chat(model='llama3.2', messages=self.messages)
-                self.messages.append(final_response['message'])
+                final_response = await self.client.chat(model='llama3.2', messages=self.history.build(), keep_alive=KEEP_ALIVE)
+                self.history.append(final_response['message'])
                 save_messages_to_json(self.messages, self.save_folderpath)  # Salva o histórico atualizado
                 return final_response['message']['content']
         return response['message']['content']
@@ -462,10 +507,29 @@ class PlannerAgent:
         """
         return await self.chat_agent.get_response(prompt, model)
 
+    async def chat_stream(self, prompt, model, commit=True):
+        """
+        Método para enviar uma mensagem ao LLM via ChatAgent recebendo a resposta em streaming.
+
+        Args:
+            prompt (str): Mensagem do usuário.
+            model (str): Modelo do LLM a ser utilizado.
+            commit (bool): Se False, o histórico não é alterado.
+
+        Yields:
+            str: Trechos da resposta do LLM.
+        """
+        async for token in self.chat_agent.stream_response(prompt, model, commit=commit):
+            yield token
+
     async def plan_task(self, prompt, model):
         """
         Usa um template para criar um prompt que ajuda a decidir a ação apropriada.
 
+        O pedido ao planner vai depois do histórico do ChatAgent, de forma que a
+        requisição compartilha o prefixo (e o cache KV) das requisições de chat. A decisão
+        não entra no histórico.
+
         Args:
             prompt (str): Mensagem do usuário.
             model (str): Modelo do LLM a ser utilizado.
@@ -487,19 +551,17 @@ If none of the above options are relevant, no response is necessary.
 Tool Mapping:
 {tools_mapping}
 
-Message History:
-{messages}
-
 Additional Notes:
 
-If the user's message suggests they want to try again or perform a similar task, refer to the Message History to decide whether to perform a 'tool_call', based on previous context.
+If the user's message suggests they want to try again or perform a similar task, refer to the conversation above to decide whether to perform a 'tool_call', based on previous context.
 User Input:
 {userprompt}"""
         template = ChatPromptTemplate.from_template(template_text)
-        Planer_prompt = template.format(tools_mapping=self.tools_mapping, messages=self.chat_agent.messages, userprompt=prompt)
-        response = await self.chat_agent.client.generate(model=model, prompt=Planer_prompt)
-        decision = response['response']
-        self.chat_agent.messages.append({'role': 'plannerAgent', 'content': decision})
+        tool_names = ", ".join(getattr(self.tools_mapping, 'tools_mapping', self.tools_mapping))
+        Planer_prompt = template.format(tools_mapping=tool_names, userprompt=prompt)
+        messages = self.chat_agent.history.build({'role': 'user', 'content': Planer_prompt})
+        response = await self.chat_agent.client.chat(model=model, messages=messages, keep_alive=KEEP_ALIVE)
+        decision = response['message']['content']
 
         # Decide a ação com base na decisão do LLM
         if "tool_call" in decision.lower():
@@ -517,6 +579,8 @@ class AgentINSTRUCT(LLMBase):
     """
     Classe que coordena os agentes e integra as funcionalidades.
     """
+    supports_speculation = True
+
     def __init__(self, host, save_folderpath:str, GOOGLE_API_KEY, YOUR_SEARCH_ENGINE_ID, OPENWEATHERMAP_API_KEY):
         """
         Inicializa os agentes e pré-carrega o LLM.
@@ -535,6 +599,24 @@ class AgentINSTRUCT(LLMBase):
         message = stream['response']
         print("Pre-LOADED Ollama", message)
 
+    async def _stream(self, messages, model, **opts):
+        """
+        Envia as mensagens diretamente ao LLM, sem planner nem histórico, em streaming.
+
+        Args:
+            messages (list): Mensagens no formato {'role', 'content'}.
+            model (str): Modelo do LLM a ser utilizado.
+            **opts: `keep_alive` e opções do modelo.
+
+        Yields:
+            str: Trechos da resposta do LLM.
+        """
+        keep_alive = opts.pop('keep_alive', KEEP_ALIVE)
+        stream = await self.chat_agent.client.chat(model=model, messages=messages, stream=True, keep_alive=keep_alive, options=opts or None)
+        async with aclosing(stream):
+            async for chunk in stream:
+                yield chunk['message']['content']
+
     async def generate(self, prompt, model):
         """
         Gera uma resposta ao prompt fornecido usando o planner_agent.
@@ -546,33 +628,8 @@ class AgentINSTRUCT(LLMBase):
         Returns:
             str: Resposta gerada.
         """
-        messages = [
-            {
-                "role": "system",
-                "content": prompt
-            },
-        ]
-        message = ''
-        stream = await self.planner_agent.plan_task(prompt, model)
-
-        # Processa o stream de resposta do LLM
-        for chunk in stream:
-            if globals.processing is False:
-                print("Break globals.processing is False")
-                break  # Se o sinal de parada for definido, interrompe o processamento
-
-            message += chunk['response']  # Adiciona o chunk de resposta gerado
-            next_token = chunk['response']
-
-            if next_token:
-                # Se houver um token de pausa, processa a sentença
-                if next_token in [".", "!", "?", ":", ";", "?!", "\n", "\n\n"]:
-                    process_sentence([next_token])
-
-        # Verifica se o processamento ainda está habilitado e processa qualquer sentença restante
-        if globals.processing and message:
-            process_sentence([message])
-
+        # plan_task devolve a resposta completa (da ferramenta ou do chat_agent)
+        message = await self.planner_agent.plan_task(prompt, model)
         return message if message else "<EOS>"
     
     async def chat_rag(self, prompt, model):
@@ -603,6 +660,31 @@ class AgentINSTRUCT(LLMBase):
         response = await self.planner_agent.chat(prompt, model)
         return response if response else "<EOS>"
 
+    async def chat_stream(self, prompt, model, commit=True):
+        """
+        Envia uma mensagem ao LLM via planner_agent e entrega a resposta token a token.
+
+        Args:
+            prompt (str): Mensagem do usuário.
+            model (str): Modelo do LLM a ser utilizado.
+            commit (bool): Se False, o histórico não é alterado (ver commit_turn).
+
+        Yields:
+            str: Trechos da resposta do LLM.
+        """
+        async for token in self.planner_agent.chat_stream(prompt, model, commit=commit):
+            yield token
+
+    def commit_turn(self, prompt, response):
+        """
+        Registra no histórico um turno gerado com chat_stream(commit=False).
+
+        Args:
+            prompt (str): Mensagem do usuário.
+            response (str): Resposta do LLM que foi de fato usada.
+        """
+        self.chat_agent.commit_turn(prompt, response)
+
 # Função principal assíncrona que coordena os agentes
 async def main(model):
     """
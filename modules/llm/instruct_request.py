@@ -1,5 +1,6 @@
 import asyncio
 import json
+from contextlib import aclosing
 import os
 import requests
 from modules.llm.llm_base import LLMBase
@@ -8,6 +9,7 @@ from modules.utils.conversation_utils import process_line, clean_raw_bytes, proc
 from jinja2 import Template
 import globals
 from ollama import AsyncClient, Client
+from modules.utils.http_clients import get_ollama_async_client
 
 LLAMA3_TEMPLATE = """{% set loop_messages = messages %}{% for message in loop_messages %}{% set content = '<|start_header_id|>' + message['role'] + '<|end_header_id|>\n\n'+ message['content'] | trim + '<|eot_id|>' %}{% if loop.index0 == 0 %}{% set content = bos_token + content %}{% endif %}{{ content }}{% endfor %}{% if add_generation_prompt %}{{ '<|start_header_id|>assistant<|end_header_id|>\n\n' }}{% endif %}"""
 OPENAI_API_KEY = ""
@@ -17,9 +19,12 @@ class INSTRUCT(LLMBase):
     Classe INSTRUCT que herda da LLMBase para implementar a funcionalidade de geração de respostas utilizando um modelo LLM.
 
     Atributos:
-        client (Client): Cliente para comunicação com o servidor LLM.
+        client (AsyncClient): Cliente assíncrono para comunicação com o servidor LLM.
         template (Template): Template Jinja2 utilizado para formatar mensagens.
     """
+    # Cada requisição renderiza só as mensagens recebidas, sem histórico
+    supports_speculation = True
+
     def __init__(self, host):
         """
         Inicializa a classe INSTRUCT.
@@ -27,12 +32,35 @@ class INSTRUCT(LLMBase):
         Args:
             host (str): Host do servidor LLM.
         """
-        self.client = Client(host=host)
+        self.client = get_ollama_async_client(host)
         self.template = Template(LLAMA3_TEMPLATE)
 
-    def generate(self, prompt, model):
+    async def _stream(self, messages, model, **opts):
+        """
+        Renderiza as mensagens com o template Llama 3 e gera a resposta em streaming.
+
+        Args:
+            messages (list): Mensagens no formato {'role', 'content'}.
+            model (str): Nome do modelo a ser utilizado.
+            **opts: `keep_alive` e opções do modelo.
+
+        Yields:
+            str: Trechos da resposta do modelo.
+        """
+        prompt = self.template.render(
+            messages=messages,
+            bos_token="<|begin_of_text|>",
+            add_generation_prompt=True,
+        )
+        keep_alive = opts.pop('keep_alive', 1600)
+        stream = await self.client.generate(model=model, prompt=prompt, stream=True, keep_alive=keep_alive, options=opts or None)
+        async with aclosing(stream):
+            async for chunk in stream:
+                yield chunk['response']
+
+    async def generate(self, prompt, model):
         """
-        Gera uma resposta do modelo baseado no prompt fornecido.
+        Gera uma resposta do modelo baseado no prompt fornecido, enviado como mensagem de sistema.
 
         Args:
             prompt (str): Texto de entrada do usuário.
@@ -47,22 +75,14 @@ class INSTRUCT(LLMBase):
                 "content": prompt
             },
         ]
-        prompt = self.template.render(
-            messages=self.messages,
-            bos_token="<|begin_of_text|>",
-            add_generation_prompt=True,
-        )
-        
-        # Use self.client.generate instead of requests.post for streaming
         message = ''
-        stream = self.client.generate(model=model, prompt=prompt, stream=True, keep_alive=1600)
-        for chunk in stream:
+        async for token in self.astream(self.messages, model):
             if globals.processing is False:
                 print("Break globals.processing is False")
                 break  # Se a flag de parada estiver definida, interrompa o processamento
 
-            message += chunk['response']  # Adiciona o trecho da resposta gerada
-            next_token = chunk['response']
+            message += token.text  # Adiciona o trecho da resposta gerada
+            next_token = token.text
 
             if next_token:
                 # Se houver um token de pausa, processa a sentença
@@ -1,4 +1,43 @@
-class LLMBase:
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from dataclasses import dataclass
+
+@dataclass
+class LLMToken:
+    """
+    Trecho de texto gerado pelo LLM durante o streaming.
+
+    Atributos:
+    ----------
+    text (str): Texto do trecho.
+    index (int): Posição do trecho na resposta (0 é o primeiro).
+    elapsed (float): Segundos desde o envio da requisição; no primeiro trecho é o
+        tempo até o primeiro token.
+    """
+    text: str
+    index: int
+    elapsed: float
+
+def as_messages(prompt):
+    """
+    Converte um prompt em lista de mensagens no formato de chat.
+
+    Parâmetros:
+    -----------
+    prompt (str | list): Texto do usuário ou lista de mensagens já pronta.
+
+    Retorna:
+    --------
+    list: Lista de mensagens {'role', 'content'}.
+    """
+    if isinstance(prompt, str):
+        return [{'role': 'user', 'content': prompt}]
+    return list(prompt)
+
+class LLMBase(ABC):
     """
     Classe base para fornecimento de provedores LLM (Large Language Models).
     Esta classe permite selecionar dinamicamente diferentes provedores de LLM
@@ -18,6 +57,17 @@ class LLMBase:
 
     Métodos:
     --------
+    astream(messages, model, **opts):
+        Contrato comum de streaming: gera a resposta como um iterador assíncrono de
+        LLMToken, registrando o tempo até o primeiro token. Os provedores implementam
+        `_stream`, que entrega os trechos de texto crus.
+        Parâmetros:
+            messages (list): Mensagens no formato {'role', 'content'}.
+            model (str): O nome do modelo a ser utilizado para geração.
+            **opts: Opções repassadas ao provedor (temperatura, keep_alive...).
+        Retorna:
+            Iterador assíncrono de LLMToken.
+
     chat(messages, model):
         Gera uma resposta baseada em uma lista de mensagens e no modelo fornecido.
         Parâmetros:
@@ -33,8 +83,30 @@ class LLMBase:
             model (str): O nome do modelo a ser utilizado para geração.
         Retorna:
             A resposta gerada pelo modelo LLM.
+
+    generate_sync(prompt, model):
+        Versão síncrona de generate, para quem chama fora de um loop asyncio.
+
+    chat_stream(prompt, model):
+        Gera uma resposta token a token, como um iterador assíncrono.
+        Parâmetros:
+            prompt (str): Mensagem do usuário.
+            model (str): O nome do modelo a ser utilizado para geração.
+        Retorna:
+            Iterador assíncrono com os trechos de texto gerados.
+
+    commit_turn(prompt, response):
+        Registra no histórico um turno gerado com chat_stream(commit=False).
+
+    Atributos:
+    ----------
+    supports_speculation (bool):
+        True se chat_stream(commit=False) gera sem alterar o histórico, permitindo
+        iniciar a resposta a partir de uma transcrição parcial e descartá-la depois.
     """
 
+    supports_speculation = False
+
     @staticmethod
     def get_llm_provider(provider_name, host=None, save_folderpath=None, GOOGLE_API_KEY=None, YOUR_SEARCH_ENGINE_ID=None, OPENWEATHERMAP_API_KEY=None,):
         """
@@ -58,7 +130,7 @@ class LLMBase:
             return OpenAILLM()
         elif provider_name == 'ollama':
             from .ollama import OllamaLLM
-            return OllamaLLM()
+            return OllamaLLM(host=host)
         elif provider_name == 'INSTRUCT':
             from .instruct_request import INSTRUCT
             return INSTRUCT(host=host)
@@ -68,20 +140,68 @@ class LLMBase:
         else:
             raise ValueError(f"Unknown LLM provider: {provider_name}")
 
+    @abstractmethod
+    def _stream(self, messages, model, **opts):
+        """
+        Gerador assíncrono com os trechos de texto crus da resposta. Cada provedor
+        implementa este método; o streaming com medição de tempo fica em `astream`.
+
+        Parâmetros:
+        -----------
+        messages (list): Mensagens no formato {'role', 'content'}.
+        model (str): O modelo LLM a ser utilizado para a geração da resposta.
+        **opts: Opções específicas do provedor.
+
+        Retorna:
+        --------
+        AsyncIterator[str]: Trechos de texto gerados.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not implement _stream")
+
+    async def astream(self, messages, model, **opts):
+        """
+        Gera a resposta como um iterador assíncrono de LLMToken, sem bloquear o loop.
+
+        O tempo até o primeiro token e a duração total são registrados no log. Fechar ou
+        cancelar o iterador fecha o stream do provedor.
+
+        Parâmetros:
+        -----------
+        messages (list | str): Mensagens no formato {'role', 'content'} ou o texto do usuário.
+        model (str): O modelo LLM a ser utilizado para a geração da resposta.
+        **opts: Opções repassadas ao provedor.
+
+        Retorna:
+        --------
+        AsyncIterator[LLMToken]: Trechos gerados, com o tempo desde o início da requisição.
+        """
+        start = time.perf_counter()
+        index = 0
+        async with aclosing(self._stream(as_messages(messages), model, **opts)) as stream:
+            async for text in stream:
+                if not text:
+                    continue
+                elapsed = time.perf_counter() - start
+                if index == 0:
+                    logging.info(f"{type(self).__name__} [{model}] tempo até o primeiro token: {elapsed:.3f} s")
+                yield LLMToken(text, index, elapsed)
+                index += 1
+        logging.info(f"{type(self).__name__} [{model}] {index} trechos em {time.perf_counter() - start:.3f} s")
+
     async def chat(self, messages, model):
         """
         Método assíncrono para gerar uma resposta com base em uma lista de mensagens e em um modelo.
 
         Parâmetros:
         -----------
-        messages (list): Lista de mensagens de entrada para o LLM gerar uma resposta.
+        messages (list | str): Lista de mensagens de entrada, ou o texto do usuário.
         model (str): O modelo LLM a ser utilizado para a geração da resposta.
 
         Retorna:
         --------
         str: Resposta gerada pelo modelo LLM.
         """
-        return await self.provider.chat(messages, model)
+        return "".join([token.text async for token in self.astream(messages, model)])
 
     async def generate(self, prompt, model):
         """
@@ -96,4 +216,60 @@ class LLMBase:
         --------
         str: Resposta gerada pelo modelo LLM.
         """
-        return await self.provider.generate(prompt, model)
+        return await self.chat(prompt, model)
+
+    def generate_sync(self, prompt, model):
+        """
+        Gera uma resposta de forma síncrona, rodando generate em um loop próprio.
+
+        Parâmetros:
+        -----------
+        prompt (str): O texto de entrada para o LLM gerar uma resposta.
+        model (str): O modelo LLM a ser utilizado para a geração da resposta.
+
+        Retorna:
+        --------
+        str: Resposta gerada pelo modelo LLM.
+
+        Exceções:
+        ---------
+        RuntimeError: Se chamado de dentro de um loop asyncio; use `await generate(...)`.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.generate(prompt, model))
+        raise RuntimeError("generate_sync called from a running event loop, use 'await generate(...)'")
+
+    async def chat_stream(self, prompt, model, commit=True):
+        """
+        Método assíncrono que gera a resposta em trechos, à medida que o modelo produz os tokens.
+
+        A implementação padrão envia o prompt como mensagem do usuário via `astream`, sem
+        histórico. Provedores que mantêm histórico devem sobrescrever este método.
+
+        Parâmetros:
+        -----------
+        prompt (str): Mensagem do usuário.
+        model (str): O modelo LLM a ser utilizado para a geração da resposta.
+        commit (bool): Se False, o turno não é registrado no histórico (ver commit_turn).
+            Só é respeitado por provedores com `supports_speculation`.
+
+        Retorna:
+        --------
+        AsyncIterator[str]: Trechos de texto gerados pelo modelo LLM.
+        """
+        async with aclosing(self.astream(prompt, model)) as stream:
+            async for token in stream:
+                yield token.text
+
+    def commit_turn(self, prompt, response):
+        """
+        Registra no histórico um turno gerado com chat_stream(commit=False).
+
+        Parâmetros:
+        -----------
+        prompt (str): Mensagem do usuário.
+        response (str): Resposta do LLM que foi de fato usada.
+        """
+        pass
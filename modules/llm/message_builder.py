@@ -0,0 +1,62 @@
+KEEP_ALIVE = 600  # Segundos que o modelo (e o cache KV do prompt) fica carregado no servidor
+VALID_ROLES = ('system', 'user', 'assistant', 'tool')
+
+def normalize_message(message):
+    """
+    Reduz uma mensagem às chaves enviadas ao LLM, sempre na mesma ordem, para que a
+    mesma mensagem seja serializada com os mesmos bytes em todas as requisições.
+
+    Args:
+        message (dict): Mensagem com 'role' e 'content' (e 'tool_calls', opcional).
+
+    Returns:
+        dict: Mensagem normalizada.
+    """
+    normalized = {'role': message['role'], 'content': message.get('content') or ''}
+    if message.get('tool_calls'):
+        normalized['tool_calls'] = message['tool_calls']
+    return normalized
+
+class MessageBuilder:
+    """
+    Monta as mensagens enviadas ao LLM mantendo um prefixo estável byte a byte: o prompt
+    de sistema e o histórico vêm primeiro e só crescem por append; o que muda a cada
+    requisição (a mensagem nova, instruções do planner) vai sempre no fim, sem entrar
+    no histórico.
+
+    O servidor reaproveita o cache KV do maior prefixo em comum com a requisição anterior,
+    então o custo de avaliar o prompt fica proporcional aos tokens novos. Chat e planner
+    usam o mesmo prefixo, assim uma requisição não invalida o cache da outra.
+    """
+
+    def __init__(self, messages=None):
+        """
+        Args:
+            messages (list, optional): Histórico carregado. Mensagens com papéis que o LLM
+                não conhece (ex.: decisões antigas do planner) são descartadas.
+        """
+        self.messages = [
+            normalize_message(message) for message in messages or []
+            if message and message.get('role') in VALID_ROLES
+        ]
+
+    def build(self, *tail):
+        """
+        Retorna o histórico seguido das mensagens novas, sem alterar o histórico.
+
+        Args:
+            *tail (dict): Mensagens que só valem para esta requisição.
+
+        Returns:
+            list: Mensagens a enviar ao LLM.
+        """
+        return self.messages + [normalize_message(message) for message in tail]
+
+    def append(self, *messages):
+        """
+        Acrescenta mensagens ao fim do histórico, preservando o prefixo já enviado.
+
+        Args:
+            *messages (dict): Mensagens a registrar.
+        """
+        self.messages.extend(normalize_message(message) for message in messages)
@@ -1,7 +1,10 @@
+from contextlib import aclosing
 from modules.llm.llm_base import LLMBase
 import ollama
 from colorama import *
 from ollama import AsyncClient, Client
+from modules.utils.http_clients import get_ollama_client, get_ollama_async_client
+from modules.llm.message_builder import KEEP_ALIVE
 
 class OllamaLLM(LLMBase):
     """
@@ -11,32 +14,41 @@ class OllamaLLM(LLMBase):
         client (Client): Cliente para comunicação síncrona com o servidor LLM.
         asyncclient (AsyncClient): Cliente para comunicação assíncrona com o servidor LLM.
     """
-    def __init__(self, host):
+    # Não guarda histórico, então uma resposta especulativa pode ser descartada
+    supports_speculation = True
+
+    def __init__(self, host=None):
         """
         Inicializa a classe OllamaLLM.
 
         Args:
-            host (str): Host do servidor LLM.
+            host (str, optional): Host do servidor LLM; None usa o padrão do cliente
+                (OLLAMA_HOST ou localhost).
         """
-        self.client = Client(host=host)
-        self.asyncclient = AsyncClient(host=host)
+        # Clientes compartilhados no processo: reutilizam as conexões keep-alive com o host
+        self.client = get_ollama_client(host)
+        self.asyncclient = get_ollama_async_client(host)
 
-    def generate(self, prompt, model):
+    async def _stream(self, messages, model, **opts):
         """
-        Gera uma resposta do modelo LLM de forma síncrona.
+        Envia as mensagens ao endpoint de chat em streaming e entrega o texto de cada chunk.
+
+        Se o consumidor for cancelado ou fechar o gerador, a conexão HTTP com o servidor
+        é fechada na hora, o que interrompe a geração no Ollama.
 
         Args:
-            prompt (str): O prompt para o modelo LLM.
+            messages (list): Mensagens no formato {'role', 'content'}.
             model (str): O nome do modelo a ser usado.
+            **opts: `keep_alive` e opções do modelo (temperature, num_ctx...).
 
-        Returns:
-            str: Resposta do modelo.
+        Yields:
+            str: Trechos da resposta do modelo.
         """
-        message = ''
-        stream = self.client.generate(model=model, prompt=prompt, stream=True, keep_alive=600)
-        for chunk in stream:
-            message += chunk['response']
-        return message
+        keep_alive = opts.pop('keep_alive', KEEP_ALIVE)
+        stream = await self.asyncclient.chat(model=model, messages=messages, stream=True, keep_alive=keep_alive, options=opts or None)
+        async with aclosing(stream):
+            async for chunk in stream:
+                yield chunk['message']['content']
     
     async def asyncgenerate(self, prompt, model):
         """
@@ -1,6 +1,6 @@
 from modules.llm.llm_base import LLMBase
 from dotenv import load_dotenv
-import openai
+from openai import AsyncOpenAI, OpenAIError
 import os
 
 class OpenAILLM(LLMBase):
@@ -10,7 +10,11 @@ class OpenAILLM(LLMBase):
     Atributos:
         api_key (str): Chave da API da OpenAI obtida das variáveis de ambiente.
         model (str): Nome do modelo a ser utilizado.
+        client (AsyncOpenAI): Cliente assíncrono da API da OpenAI.
     """
+    # Não guarda histórico, então uma resposta especulativa pode ser descartada
+    supports_speculation = True
+
     def __init__(self):
         """
         Inicializa a classe OpenAILLM, carregando a chave da API e o modelo a ser utilizado.
@@ -25,35 +29,46 @@ class OpenAILLM(LLMBase):
         if not self.api_key:
             raise ValueError("OpenAI API key not found. Please set the 'OPENAI_API_KEY' environment variable.")
         
-        openai.api_key = self.api_key
+        self.client = AsyncOpenAI(api_key=self.api_key)
+
+    async def _stream(self, messages, model, **opts):
+        """
+        Envia as mensagens ao endpoint de chat completions em streaming.
+
+        Args:
+            messages (list): Mensagens no formato {'role', 'content'}.
+            model (str): O nome do modelo a ser usado; None usa LLMMODEL.
+            **opts: Parâmetros repassados à API (temperature, max_tokens...).
+
+        Yields:
+            str: Trechos da resposta do modelo.
+        """
+        stream = await self.client.chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            stream=True,
+            **opts
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
 
-    def generate(self, prompt):
+    async def generate(self, prompt, model=None):
         """
         Gera uma resposta do modelo LLM utilizando a API da OpenAI.
 
         Args:
             prompt (str): O prompt para o modelo LLM.
+            model (str, optional): O nome do modelo; None usa LLMMODEL.
 
         Returns:
             str: Resposta gerada pelo modelo ou None em caso de erro.
         """
         try:
-            response = openai.Completion.create(
-                model=self.model,
-                prompt=prompt,
-                max_tokens=150,
-                n=1,
-                stop=None,
-                temperature=0.7,
-                stream=True
-            )
-            message = ''
-            for chunk in response:
-                if 'choices' in chunk and chunk['choices']:
-                    message += chunk['choices'][0]['text']
-                    print(chunk['choices'][0]['text'], end='', flush=True)
-            print("\n")
-            return message
-        except openai.error.OpenAIError as e:
+            return await self.chat(prompt, model or self.model)
+        except OpenAIError as e:
             print(f"An error occurred: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -1,26 +1,105 @@
-import threading
 import time
 import logging
-import queue
-from queue import Queue
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
 import copy
+from contextlib import aclosing
 import sounddevice as sd
 from loguru import logger
 from colorama import Style, Fore
 from modules.kokoro import Kokoro
-from modules.utils.audio_utils import percentage_played_audio, clip_interrupted_sentence
+from modules.utils.audio_utils import get_audio_player, clip_sentence_at
+from modules.utils.conversation_utils import SentenceSegmenter
+from modules.utils.http_clients import close_clients
 import globals
 import asyncio
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-PAUSE_TIME = 0.05
+EXECUTOR_WORKERS = 6  # Threads para o trabalho bloqueante (microfone, teclado, síntese, reprodução)
+TTS_LOOKAHEAD = 2  # Sentenças sintetizadas à frente da reprodução
+ECHO_TAIL_S = 1.5  # Depois do fim do áudio, a voz do assistente ainda pode chegar ao microfone e às parciais
+SPECULATION_MIN_SIMILARITY = 0.9  # Semelhança mínima entre a transcrição parcial e a final para aproveitar a resposta
+
+def normalize_transcript(text):
+    """
+    Normaliza uma transcrição para comparação: minúsculas, sem pontuação e com
+    espaços simples.
+
+    Args:
+        text (str): Texto transcrito.
+
+    Returns:
+        str: Texto normalizado.
+    """
+    words = "".join(char if char.isalnum() else " " for char in text.lower()).split()
+    return " ".join(words)
+
+def transcript_similarity(a, b):
+    """
+    Semelhança entre duas transcrições, de 0 a 1.
+
+    Args:
+        a (str): Primeira transcrição.
+        b (str): Segunda transcrição.
+
+    Returns:
+        float: 1.0 para textos iguais após a normalização.
+    """
+    a, b = normalize_transcript(a), normalize_transcript(b)
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+class Speculation:
+    """
+    Resposta do LLM iniciada a partir de uma transcrição parcial, antes do fim da fala.
+
+    Os tokens ficam guardados até a transcrição final decidir se a resposta é
+    aproveitada (stream) ou descartada (cancel).
+    """
+
+    def __init__(self, kokoro, prompt):
+        """
+        Args:
+            kokoro (Kokoro): Instância usada para consultar o LLM.
+            prompt (str): Transcrição parcial enviada ao LLM.
+        """
+        self.prompt = prompt
+        self.started = time.time()
+        self.tokens = asyncio.Queue()
+        self.task = asyncio.create_task(self._generate(kokoro), name="speculation")
+
+    async def _generate(self, kokoro):
+        try:
+            async for token in kokoro.chat_stream(userprompt=self.prompt, commit=False):
+                self.tokens.put_nowait(token)
+        except Exception as e:
+            logging.error(f"Error in speculative generation: {e}")
+        finally:
+            self.tokens.put_nowait(None)
+
+    async def stream(self):
+        """
+        Entrega os tokens já gerados e continua acompanhando a geração até o fim.
+
+        Yields:
+            str: Trechos da resposta do LLM.
+        """
+        while (token := await self.tokens.get()) is not None:
+            yield token
+
+    def cancel(self):
+        """
+        Cancela a geração, fechando o stream com o servidor LLM.
+        """
+        self.task.cancel()
 
 class Queues:
-    def __init__(self, kokoro: Kokoro, your_name, personality, character, debug=False, debug_time_logs=False):
+    def __init__(self, kokoro: Kokoro, your_name, personality, character, debug=False, debug_time_logs=False, stream=True, tts_lookahead=TTS_LOOKAHEAD, speculative=True, echo_guard=False):
         """
         Inicializa a classe Queues, responsável por gerenciar filas e coordenar a execução
-        de diferentes tarefas em threads paralelas.
+        das etapas de STT, LLM e TTS em um único loop asyncio.
 
         Args:
             kokoro (Kokoro): Instância da classe Kokoro para processamento de linguagem.
@@ -29,14 +108,29 @@ class Queues:
             character (str): Nome do personagem do chatbot.
             debug (bool): Indicador para ativar ou desativar o modo de depuração.
             debug_time_logs (bool): Indicador para ativar ou desativar os logs de tempo.
+            stream (bool): Se True, a resposta do LLM é enviada ao TTS sentença por sentença
+                enquanto ainda está sendo gerada, em vez de aguardar a resposta completa.
+            tts_lookahead (int): Quantas sentenças já sintetizadas podem aguardar a reprodução.
+            speculative (bool): Se True (e com stream), a consulta ao LLM começa assim que a
+                transcrição parcial se estabiliza, antes do fim da fala. Só tem efeito com
+                provedores LLM que suportam especulação.
+            echo_guard (bool): Se True, enquanto o áudio da resposta toca (e por `ECHO_TAIL_S`
+                depois), o microfone, que também capta a voz do assistente pelos alto-falantes,
+                só interrompe a resposta se a fala tiver a palavra-chave. Sem palavra-chave
+                configurada, isso desliga o barge-in durante a reprodução; use com caixas de
+                som em vez de fones de ouvido.
         """
-        self.retrieve_comments_queue = Queue()
-        self.gpt_generation_queue = Queue()
-        self.tts_generation_queue = Queue()
+        self.gpt_generation_queue = asyncio.Queue()
+        self.tts_generation_queue = asyncio.Queue()
+        self.audio_playback_queue = asyncio.Queue(maxsize=max(1, tts_lookahead))
+        self.audio_player = get_audio_player()
+        self.skip_until_eos = False
+        self.eos_in_flight = False  # tts_generation aguarda espaço para repassar um '<EOS>'
+        self.pending_audio_put = None  # Inserção de áudio aguardando espaço na fila de reprodução
 
-        self.gpt_generated = threading.Event()
-        self.tts_generated = threading.Event()
-        self.end_received = threading.Event()
+        self.end_received = asyncio.Event()
+        self.loop = None
+        self.executor = None
 
         self.kokoro = kokoro
         self.your_name = your_name
@@ -44,6 +138,13 @@ class Queues:
         self.character = character
         self.debug = debug
         self.debug_time_logs = debug_time_logs
+        self.stream = stream
+        self.speculative = speculative and stream and self.kokoro.supports_speculation
+        self.speculation = None
+        self.last_partial = ""
+        self.generation_task = None  # Resposta do LLM em andamento, cancelada no barge-in
+        self.playing = False
+        self.echo_guard = echo_guard
 
         if self.kokoro.messages:
             self.kokoro.messages = [{}]
@@ -59,31 +160,65 @@ class Queues:
 
     def run(self):
         """
-        Inicia todas as threads necessárias para o processamento em paralelo.
-
-        Returns:
-            list: Lista de threads que foram iniciadas.
+        Inicia o loop asyncio que executa todas as etapas e bloqueia até o comando 'exit'.
         """
         self._log_info("Starting up!")
-        threads = []
-        for func in [self.gpt_generation_wrapper, self.tts_generation, self.stt_recognition, self.handle_personal_input]:
-            t = threading.Thread(target=self.thread_wrapper, args=(func,))
-            t.start()
-            threads.append(t)
-        return threads
+        asyncio.run(self.main())
+
+    async def main(self):
+        """
+        Cria as tarefas de cada etapa no loop atual e aguarda o sinal de encerramento.
+
+        O trabalho bloqueante (captura de voz, leitura do teclado, síntese de voz) é
+        executado em um pool de threads, de forma que o loop só acorda quando há algo
+        nas filas.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="queues")
+        if self.speculative and not self.kokoro.set_partial_callback(self.on_partial_transcript):
+            self.speculative = False
+        self.kokoro.set_speech_callback(self.on_speech_start)
+        stages = [self.gpt_generation, self.tts_generation, self.audio_playback, self.stt_recognition, self.handle_personal_input]
+        tasks = [asyncio.create_task(self.stage_wrapper(stage), name=stage.__name__) for stage in stages]
+        try:
+            await self.end_received.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.cancel_speculation()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.audio_player.close()
+            await asyncio.to_thread(self.kokoro.close)
+            await close_clients()
 
-    def thread_wrapper(self, func):
+    async def stage_wrapper(self, stage):
         """
-        Função que encapsula a execução das threads para tratamento de exceções.
+        Executa uma etapa e a reinicia em caso de exceção, até o encerramento.
 
         Args:
-            func (function): Função a ser executada na thread.
+            stage (function): Corrotina da etapa a ser executada.
         """
         while not self.end_received.is_set():
             try:
-                func()
+                await stage()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logging.error(f"Error in {func.__name__}: {e}")
+                logging.error(f"Error in {stage.__name__}: {e}")
+
+    async def run_blocking(self, func, *args):
+        """
+        Executa uma função bloqueante no pool de threads sem travar o loop.
+
+        Args:
+            func (function): Função a ser executada.
+            *args: Argumentos repassados para a função.
+
+        Returns:
+            Any: Valor retornado pela função.
+        """
+        return await self.loop.run_in_executor(self.executor, func, *args)
 
     def _log_info(self, message):
         """
@@ -95,96 +230,403 @@ class Queues:
         if self.debug:
             logging.info(message)
 
-    def gpt_generation_wrapper(self):
-        """
-        Wrapper para executar gpt_generation com asyncio.run.
-        """
-        asyncio.run(self.gpt_generation())
-
     async def gpt_generation(self):
         """
         Processa o texto reconhecido usando o modelo GPT e insere a resposta na fila de TTS.
+
+        Cada resposta roda em uma tarefa própria (`generation_task`), que o barge-in cancela
+        sem derrubar esta etapa.
         """
         while not self.end_received.is_set():
+            detected_text = await self.gpt_generation_queue.get()
             start_time = time.time()
+            globals.processing = True
+            if self.stream:
+                generation = self.stream_to_tts(detected_text)
+            else:
+                generation = self.generate_to_tts(detected_text)
+            task = asyncio.create_task(generation, name="generation")
+            self.generation_task = task
             try:
-                detected_text = self.gpt_generation_queue.get(timeout=0.1)
-                response = await self.kokoro.chat(userprompt=detected_text)
-                if response:
-                    self.tts_generation_queue.put(response)
-            except queue.Empty:
-                await asyncio.sleep(PAUSE_TIME)
+                await asyncio.wait({task})
+            finally:
+                task.cancel()
+                self.generation_task = None
+            if task.cancelled():
+                self._log_info("Response generation cancelled.")
+            elif task.exception():
+                raise task.exception()
             end_time = time.time()
             if self.debug_time_logs:
                 logging.info(f"gpt_generation - Tempo de ciclo: {end_time - start_time:.4f} segundos")
 
-    def handle_personal_input(self):
+    async def generate_to_tts(self, detected_text):
+        """
+        Aguarda a resposta completa do LLM e a envia para a fila de TTS, marcando o fim
+        do turno com '<EOS>' mesmo se a tarefa for cancelada.
+
+        Args:
+            detected_text (str): Texto do usuário enviado ao LLM.
+        """
+        try:
+            response = await self.kokoro.chat(userprompt=detected_text)
+            if response:
+                await self.tts_generation_queue.put(response)
+        finally:
+            self.tts_generation_queue.put_nowait("<EOS>")
+
+    async def stream_to_tts(self, detected_text):
+        """
+        Consome a resposta do LLM token a token e envia cada sentença para a fila de TTS
+        assim que ela é fechada por pontuação, marcando o fim do turno com '<EOS>'.
+
+        Se a tarefa for cancelada, o stream do LLM é fechado antes do '<EOS>'.
+
+        Args:
+            detected_text (str): Texto do usuário enviado ao LLM.
+        """
+        segmenter = SentenceSegmenter()
+        start_time = time.time()
+        first_sentence = True
+        speculation = self.take_speculation(detected_text)
+        if speculation:
+            tokens = speculation.stream()
+            if self.debug_time_logs:
+                logging.info(f"gpt_generation - Resposta especulativa iniciada {start_time - speculation.started:.4f} segundos antes")
+        else:
+            tokens = self.kokoro.chat_stream(userprompt=detected_text)
+        response = []
+        failed = False
+        try:
+            async with aclosing(tokens):
+                async for token in tokens:
+                    response.append(token)
+                    for sentence in segmenter.push(token):
+                        if first_sentence and self.debug_time_logs:
+                            logging.info(f"gpt_generation - Primeira sentença em {time.time() - start_time:.4f} segundos")
+                        first_sentence = False
+                        await self.tts_generation_queue.put(sentence)
+            remainder = segmenter.flush()
+            if remainder:
+                await self.tts_generation_queue.put(remainder)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.tts_generation_queue.put_nowait("<EOS>")
+            if speculation:
+                speculation.cancel()
+                # Como no stream normal, um barge-in registra o trecho gerado; um erro ou
+                # uma resposta vazia não entram no histórico
+                if response and not failed:
+                    self.kokoro.commit_turn(detected_text, "".join(response))
+
+    def on_speech_start(self, wake_word_heard=False):
+        """
+        Recebe o aviso de início de fala do provedor STT, a partir da thread de reconhecimento.
+
+        Args:
+            wake_word_heard (bool): Se a palavra-chave foi reconhecida na fala.
+        """
+        self.loop.call_soon_threadsafe(self.interrupt_response, wake_word_heard)
+
+    def interrupt_response(self, wake_word_heard=False):
+        """
+        Barge-in: o usuário começou a falar durante a resposta. Cancela a geração em
+        andamento (o que fecha o stream HTTP com o servidor LLM), para a reprodução e
+        descarta o áudio pendente. O trecho já falado é registrado por audio_playback.
+
+        Com `echo_guard`, uma fala sem a palavra-chave enquanto o áudio toca é tratada
+        como eco da própria resposta e ignorada.
+
+        Args:
+            wake_word_heard (bool): Se a palavra-chave foi reconhecida na fala.
+        """
+        if not globals.interruptible:
+            return
+        if self.echo_guard and not wake_word_heard and self.audio_player.is_audible(ECHO_TAIL_S):
+            self._log_info("Speech during playback without the wake word, not interrupting.")
+            return
+        generating = self.generation_task is not None and not self.generation_task.done()
+        pending = not self.tts_generation_queue.empty() or not self.audio_playback_queue.empty()
+        if not (generating or pending or self.playing):
+            return
+        logger.info("User barged in, interrupting response.")
+        if generating:
+            self.generation_task.cancel()
+        # AudioPlayer.play para na hora e audio_playback recorta a sentença tocada
+        globals.processing = False
+        self.flush_pending_audio()
+
+    def on_partial_transcript(self, text):
+        """
+        Recebe as transcrições parciais do provedor STT, a partir da thread de reconhecimento.
+
+        Args:
+            text (str): Hipótese parcial da fala em andamento.
+        """
+        self.loop.call_soon_threadsafe(self.speculate, text)
+
+    def speculate(self, text):
+        """
+        Inicia a resposta especulativa quando a mesma transcrição parcial chega duas vezes
+        seguidas, e a reinicia se uma nova parcial estável se afasta da que está em uso.
+
+        Args:
+            text (str): Hipótese parcial da fala em andamento.
+        """
+        stable = normalize_transcript(text) == normalize_transcript(self.last_partial)
+        self.last_partial = text
+        if not stable or not normalize_transcript(text):
+            return
+        if self.speculation:
+            if transcript_similarity(self.speculation.prompt, text) >= SPECULATION_MIN_SIMILARITY:
+                return
+            self._log_info(f"Restarting speculative response: {text}")
+            self.speculation.cancel()
+        else:
+            self._log_info(f"Starting speculative response: {text}")
+        self.speculation = Speculation(self.kokoro, text)
+
+    def take_speculation(self, final_text):
+        """
+        Retira a resposta especulativa pendente, aproveitando-a se a transcrição final for
+        próxima o bastante da parcial usada. Caso contrário, ela é cancelada.
+
+        Args:
+            final_text (str): Texto que será respondido.
+
+        Returns:
+            Speculation: A resposta a aproveitar, ou None.
+        """
+        speculation, self.speculation = self.speculation, None
+        self.last_partial = ""
+        if speculation is None:
+            return None
+        similarity = transcript_similarity(speculation.prompt, final_text)
+        if similarity >= SPECULATION_MIN_SIMILARITY:
+            return speculation
+        self._log_info(f"Discarding speculative response (similarity {similarity:.2f}): {speculation.prompt}")
+        speculation.cancel()
+        return None
+
+    def cancel_speculation(self):
+        """
+        Cancela a resposta especulativa pendente, se houver.
+        """
+        if self.speculation:
+            self.speculation.cancel()
+            self.speculation = None
+        self.last_partial = ""
+
+    async def handle_personal_input(self):
         """
         Lida com o input textual do usuário e comandos especiais ('save', 'exit').
         """
         while not self.end_received.is_set():
+            personal_sentence = await self.run_blocking(input, Style.BRIGHT + Fore.MAGENTA + "\nEnter your question (or 'exit' to save and stop): " + Style.BRIGHT + Fore.WHITE)
             start_time = time.time()
-            try:
-                personal_sentence = input(Style.BRIGHT + Fore.MAGENTA + "\nEnter your question (or 'exit' to save and stop): " + Style.BRIGHT + Fore.WHITE)
-                if personal_sentence.lower() == "save":
-                    self.kokoro.save_conversation()
-                    self._log_info("Conversation saved.")
-                elif personal_sentence.lower() == "exit":
-                    self.kokoro.save_conversation()
-                    self._log_info("Conversation saved. Quitting.")
-                    self.end_received.set()
-                    break
-                else:
-                    self.gpt_generation_queue.put(personal_sentence)
-            except Exception as e:
-                logging.error(f"Error in handle_personal_input: {e}")
+            if personal_sentence.lower() == "save":
+                self.kokoro.save_conversation()
+                self._log_info("Conversation saved.")
+            elif personal_sentence.lower() == "exit":
+                self.kokoro.save_conversation()
+                self._log_info("Conversation saved. Quitting.")
+                self.end_received.set()
+                break
+            else:
+                await self.gpt_generation_queue.put(personal_sentence)
             end_time = time.time()
             if self.debug_time_logs:
                 logging.info(f"handle_personal_input - Tempo de ciclo: {end_time - start_time:.4f} segundos")
 
-    def stt_recognition(self):
+    async def stt_recognition(self):
         """
         Processa a fala em texto e insere na fila de geração de GPT.
         """
         while not self.end_received.is_set():
             start_time = time.time()
-            try:
-                recognized_text = self.kokoro.listen_for_voice(timeout=5)
-                if recognized_text:
-                    logger.info(f"Recognized Text: {recognized_text}")
-                    self.gpt_generation_queue.put(recognized_text)
-            except Exception as e:
-                logging.error(f"Error in stt_recognition: {e}")
+            recognized_text = await self.run_blocking(self.kokoro.listen_for_voice, 5)
+            if recognized_text:
+                logger.info(f"Recognized Text: {recognized_text}")
+                await self.gpt_generation_queue.put(recognized_text)
             end_time = time.time()
             if self.debug_time_logs:
                 logging.info(f"stt_recognition - Tempo de ciclo: {end_time - start_time:.4f} segundos")
 
-    def tts_generation(self):
+    async def tts_generation(self):
+        """
+        Sintetiza as sentenças da fila de TTS à frente da reprodução.
+
+        O áudio pronto vai para uma fila limitada a `tts_lookahead` itens, de forma que a
+        sentença N+1 é sintetizada enquanto a sentença N ainda está tocando. Quando o
+        provedor TTS sintetiza em lote, as sentenças que já aguardam na fila são
+        agrupadas em uma única inferência.
+        """
+        while not self.end_received.is_set():
+            generated_text = await self.tts_generation_queue.get()
+            if generated_text == "<EOS>":
+                self.eos_in_flight = True
+                try:
+                    await self.audio_playback_queue.put((generated_text, None, None, None))
+                finally:
+                    self.eos_in_flight = False
+                # Só depois de entregue: um flush durante a espera ainda pertence a este turno
+                self.skip_until_eos = False
+                continue
+            if self.skip_until_eos or not generated_text:
+                continue
+
+            sentences = await self.collect_tts_batch(generated_text)
+            start_time = time.time()
+            logging.info(f"Sent to tts_generation: {' | '.join(sentences)}")
+            if len(sentences) > 1:
+                voices = await self.run_blocking(self.kokoro.generate_voice_batch, sentences)
+            else:
+                voices = [await self.run_blocking(self.kokoro.generate_voice, generated_text)]
+            end_time = time.time()
+            if self.debug_time_logs:
+                logging.info(f"tts_generation - Tempo de síntese ({len(sentences)} sentenças): {end_time - start_time:.4f} segundos")
+            for sentence, (audio, rate) in zip(sentences, voices):
+                # A resposta pode ter sido interrompida enquanto a sentença era sintetizada
+                if self.skip_until_eos:
+                    break
+                if audio is not None and len(audio) and rate:
+                    word_timings = await self.run_blocking(self.kokoro.word_timings, sentence, audio, rate)
+                    if self.skip_until_eos:
+                        break
+                    if not await self.put_audio((sentence, audio, rate, word_timings)):
+                        break
+
+    async def put_audio(self, item):
         """
-        Gera áudio a partir do texto e executa a reprodução.
+        Coloca um áudio na fila de reprodução, esperando por espaço se preciso. Um
+        flush_pending_audio durante a espera cancela a inserção, para que a sentença
+        descartada não entre na fila depois de ela ser esvaziada.
+
+        Args:
+            item (tuple): (sentença, áudio, taxa de amostragem, tempos das palavras).
+
+        Returns:
+            bool: False se o áudio foi descartado.
+        """
+        put = asyncio.ensure_future(self.audio_playback_queue.put(item))
+        self.pending_audio_put = put
+        try:
+            await asyncio.wait({put})
+        finally:
+            put.cancel()
+            self.pending_audio_put = None
+        return not put.cancelled()
+
+    async def collect_tts_batch(self, first_sentence):
+        """
+        Junta à primeira sentença as que já aguardam na fila de TTS, até o tamanho máximo
+        de lote do provedor, esperando no máximo `max_latency_ms` por sentenças novas.
+
+        Para no '<EOS>' (que volta para a frente da fila) para não misturar turnos.
+
+        Args:
+            first_sentence (str): Sentença já retirada da fila.
+
+        Returns:
+            list: Sentenças a sintetizar juntas, na ordem da fila.
+        """
+        sentences = [first_sentence]
+        policy = self.kokoro.batch_policy
+        if policy is None:
+            return sentences
+
+        deadline = self.loop.time() + policy.max_latency_ms / 1000
+        while len(sentences) < policy.max_batch:
+            if self.tts_generation_queue.empty():
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    text = await asyncio.wait_for(self.tts_generation_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                text = self.tts_generation_queue.get_nowait()
+            if text == "<EOS>":
+                self.requeue_front(text)
+                break
+            if text:
+                sentences.append(text)
+        return sentences
+
+    def requeue_front(self, item):
+        """
+        Devolve um item para a frente da fila de TTS, mantendo a ordem dos demais.
+
+        Args:
+            item (str): Item retirado da fila que deve ser o próximo a sair.
+        """
+        pending = [item]
+        while not self.tts_generation_queue.empty():
+            pending.append(self.tts_generation_queue.get_nowait())
+        for text in pending:
+            self.tts_generation_queue.put_nowait(text)
+
+    async def audio_playback(self):
+        """
+        Toca o áudio sintetizado em sequência no stream de saída compartilhado e registra
+        o texto falado no histórico ao fim de cada resposta ou interrupção.
         """
         assistant_text = []
         while not self.end_received.is_set():
+            generated_text, audio, rate, word_timings = await self.audio_playback_queue.get()
             start_time = time.time()
-            try:
-                generated_text = self.tts_generation_queue.get(timeout=PAUSE_TIME)
-                finished = False
-                if generated_text == "<EOS>":
-                    finished = True
-                elif generated_text:
-                    logging.info(f"Sent to tts_generation: {generated_text}")
-                    audio, rate = self.kokoro.generate_voice(generated_text)
-                    if audio.any() and rate:
-                        if globals.interrupted:
-                            clipped_text = clip_interrupted_sentence(generated_text, percentage_played_audio(len(audio), rate))
-                            assistant_text.append(clipped_text)
-                        assistant_text.append(generated_text)
-                if globals.interrupted or finished:
-                    self.kokoro.messages.append({"role": self.character, "content": " ".join(assistant_text)})
-                    assistant_text.clear()
-                    globals.interrupted = False
-            except queue.Empty:
-                pass
+            finished = generated_text == "<EOS>"
+            if not finished:
+                self.playing = True
+                try:
+                    played_frames = await self.run_blocking(self.audio_player.play, audio, rate)
+                finally:
+                    self.playing = False
+                if globals.interrupted:
+                    assistant_text.append(clip_sentence_at(word_timings, played_frames))
+                    self.flush_pending_audio()
+                else:
+                    assistant_text.append(generated_text)
+            if (globals.interrupted or finished) and assistant_text:
+                self.kokoro.messages.append({"role": self.character, "content": " ".join(assistant_text)})
+                assistant_text.clear()
+            globals.interrupted = False
             end_time = time.time()
             if self.debug_time_logs:
-                logging.info(f"tts_generation - Tempo de ciclo: {end_time - start_time:.4f} segundos")
+                logging.info(f"audio_playback - Tempo de ciclo: {end_time - start_time:.4f} segundos")
+
+    def flush_pending_audio(self):
+        """
+        Descarta as sentenças da resposta interrompida que ainda não foram tocadas,
+        tanto as já sintetizadas quanto as que aguardam síntese.
+
+        O descarte para no primeiro '<EOS>': ele fecha o turno interrompido e fica na
+        fila, junto com os itens do turno seguinte que vierem depois dele.
+        """
+        self.skip_until_eos = True
+        pending = []
+        while not self.audio_playback_queue.empty():
+            pending.append(self.audio_playback_queue.get_nowait())
+        ends = [index for index, item in enumerate(pending) if item[0] == "<EOS>"]
+        if ends:
+            # A resposta interrompida já foi toda sintetizada
+            self.skip_until_eos = False
+            for item in pending[ends[0]:]:
+                self.audio_playback_queue.put_nowait(item)
+            return
+        if self.eos_in_flight:
+            # O '<EOS>' da resposta interrompida está a caminho; a fila de TTS já é do próximo turno
+            return
+        if self.pending_audio_put:
+            self.pending_audio_put.cancel()
+
+        pending = []
+        while not self.tts_generation_queue.empty():
+            pending.append(self.tts_generation_queue.get_nowait())
+        if "<EOS>" in pending:
+            # tts_generation repassa o '<EOS>' e volta a sintetizar a partir do próximo turno
+            for text in pending[pending.index("<EOS>"):]:
+                self.tts_generation_queue.put_nowait(text)
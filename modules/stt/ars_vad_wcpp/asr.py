@@ -1,8 +1,10 @@
 import ctypes
+import queue
 import numpy as np
 from loguru import logger
 from typing import Optional, List
-from contextlib import AbstractContextManager
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass
 
 # Importe seu módulo whisper_cpp_wrapper conforme necessário
 from . import whisper_cpp_wrapper
@@ -10,8 +12,13 @@ from . import whisper_cpp_wrapper
 # Constantes
 WORD_LEVEL_TIMINGS = False
 BEAM_SEARCH = True
+PARTIAL_BEAM_SEARCH = False  # Transcrições parciais usam busca gananciosa, mais rápida
 SILENCE_DURATION_MS = 500  # Duração do silêncio em milissegundos
 SAMPLE_RATE = 16000  # Taxa de amostragem do áudio
+STATE_POOL_SIZE = 2  # Estados whisper.cpp que podem transcrever ao mesmo tempo
+PREALLOCATED_SECONDS = 30  # Capacidade inicial do buffer de entrada de cada estado
+ENCODER_FRAMES_PER_SECOND = 50  # audio_ctx do whisper: 1500 quadros para 30 s
+HEAD_MAX_TOKENS = 16  # Tokens decodificados na verificação rápida do início da fala
 
 # Mapeamento de níveis de log do ggml para loguru
 _log_at_level = {
@@ -28,28 +35,54 @@ def _unlog(level: ctypes.c_int, text: whisper_cpp_wrapper.String, user_data: cty
 
 _unlog_func = whisper_cpp_wrapper.ggml_log_callback(_unlog)
 
+@dataclass
+class WhisperSlot:
+    """Um estado whisper.cpp e o buffer de entrada pré-alocado usado com ele."""
+
+    state: ctypes.c_void_p
+    buffer: np.ndarray
+
+    def load(self, audio: np.ndarray, padding: int = 0) -> np.ndarray:
+        """
+        Copia o áudio para o buffer (convertendo para float32 na própria cópia), entre
+        `padding` amostras de silêncio, e devolve a parte usada do buffer.
+        """
+        total = len(audio) + 2 * padding
+        if total > len(self.buffer):
+            self.buffer = np.zeros(max(total, 2 * len(self.buffer)), dtype=np.float32)
+        self.buffer[:padding] = 0
+        self.buffer[padding:padding + len(audio)] = audio
+        self.buffer[padding + len(audio):total] = 0
+        return self.buffer[:total]
+
 class ASR(AbstractContextManager):
     """
     Classe para reconhecimento automático de fala (ASR) usando o modelo whisper.cpp.
 
+    O modelo é carregado uma única vez e um conjunto de estados whisper.cpp, cada um
+    com seu buffer de entrada pré-alocado, permite transcrever várias falas (ou fontes
+    de microfone) ao mesmo tempo sem recarregar o modelo nem alocar a cada chamada.
+
     Atributos:
         ctx (ctypes.c_void_p): Contexto do modelo whisper.cpp.
         params: Parâmetros configurados para a transcrição.
         last_detected_language (Optional[str]): Último idioma detectado.
     """
 
-    def __init__(self, model: str) -> None:
+    def __init__(self, model: str, n_states: int = STATE_POOL_SIZE) -> None:
         """
         Inicializa o modelo whisper.cpp e configura os parâmetros.
 
         Args:
             model (str): Caminho para o arquivo de modelo a ser utilizado.
+            n_states (int): Número de estados whisper.cpp (transcrições simultâneas).
         """
         # Configura a função de callback para logs do ggml
         whisper_cpp_wrapper.whisper_log_set(_unlog_func, ctypes.c_void_p(0))
 
-        # Inicializa o contexto do modelo a partir do arquivo
-        self.ctx = whisper_cpp_wrapper.whisper_init_from_file(model.encode("utf-8"))
+        # Inicializa o contexto do modelo a partir do arquivo, sem estado próprio:
+        # toda transcrição usa um dos estados do pool
+        self.ctx = whisper_cpp_wrapper.whisper_init_from_file_no_state(model.encode("utf-8"))
         if not self.ctx:
             raise RuntimeError("Falha ao inicializar o modelo whisper.cpp.")
 
@@ -63,6 +96,32 @@ class ASR(AbstractContextManager):
         # Atributo para armazenar o último idioma detectado
         self.last_detected_language: Optional[str] = None
 
+        # Transcrições parciais usam parâmetros próprios, copiados a cada chamada
+        self.partial_params = self._whisper_cpp_params(
+            word_level_timings=False,
+            beam_search=PARTIAL_BEAM_SEARCH,
+        )
+        self.partial_params.language = whisper_cpp_wrapper.String(b"auto")
+
+        # Verificação rápida do início da fala: gananciosa, um segmento, poucos tokens
+        self.head_params = self._whisper_cpp_params(word_level_timings=False, beam_search=False)
+        self.head_params.language = whisper_cpp_wrapper.String(b"auto")
+        self.head_params.single_segment = True
+        self.head_params.no_context = True
+        self.head_params.max_tokens = HEAD_MAX_TOKENS
+
+        # Estados whisper.cpp pré-alocados; cada transcrição usa um estado livre
+        self.slots: List[WhisperSlot] = []
+        self.state_pool: queue.Queue = queue.Queue()
+        for _ in range(max(1, n_states)):
+            state = whisper_cpp_wrapper.whisper_init_state(self.ctx)
+            if not state:
+                self.close()
+                raise RuntimeError("Falha ao inicializar o estado do whisper.cpp.")
+            slot = WhisperSlot(state, np.zeros(PREALLOCATED_SECONDS * SAMPLE_RATE, dtype=np.float32))
+            self.slots.append(slot)
+            self.state_pool.put(slot)
+
     def __enter__(self):
         """Suporte ao contexto com 'with'."""
         return self
@@ -73,6 +132,9 @@ class ASR(AbstractContextManager):
 
     def close(self):
         """Libera os recursos alocados pelo whisper.cpp."""
+        for slot in getattr(self, 'slots', []):
+            whisper_cpp_wrapper.whisper_free_state(slot.state)
+        self.slots = []
         if hasattr(self, 'ctx') and self.ctx:
             whisper_cpp_wrapper.whisper_free(self.ctx)
             self.ctx = None
@@ -81,25 +143,55 @@ class ASR(AbstractContextManager):
         """Destrutor para garantir que os recursos sejam liberados."""
         self.close()
 
-    def _add_silence(self, audio: np.ndarray) -> np.ndarray:
-        """
-        Adiciona silêncio ao início e ao final do áudio.
+    @contextmanager
+    def _acquire_slot(self):
+        """Reserva um estado whisper.cpp livre durante uma transcrição."""
+        slot = self.state_pool.get()
+        try:
+            yield slot
+        finally:
+            self.state_pool.put(slot)
 
-        Args:
-            audio (np.ndarray): Array NumPy contendo o áudio original.
+    def _run(self, slot: WhisperSlot, params, audio: np.ndarray) -> str:
+        """
+        Executa o whisper.cpp em um estado e junta o texto dos segmentos.
 
-        Returns:
-            np.ndarray: Áudio com silêncio adicionado no início e no fim.
+        Raises:
+            RuntimeError: Se ocorrer um erro durante a transcrição.
         """
-        silence_samples = int((SILENCE_DURATION_MS / 1000) * SAMPLE_RATE)
-        silence = np.zeros(silence_samples, dtype=audio.dtype)
-        padded_audio = np.concatenate((silence, audio, silence))
-        return padded_audio
+        result = whisper_cpp_wrapper.whisper_full_with_state(
+            self.ctx,
+            slot.state,
+            params,
+            audio.ctypes.data_as(ctypes.POINTER(ctypes.c_float)),
+            len(audio),
+        )
+        if result != 0:
+            raise RuntimeError(f"Erro do whisper.cpp: código de erro {result}")
+
+        # Obtém o número de segmentos transcritos
+        n_segments = whisper_cpp_wrapper.whisper_full_n_segments_from_state(slot.state)
+        logger.debug(f"Número de segmentos transcritos: {n_segments}")
+
+        # Extrai o texto de cada segmento
+        text_segments: List[str] = []
+        for i in range(n_segments):
+            segment_ptr = whisper_cpp_wrapper.whisper_full_get_segment_text_from_state(slot.state, i)
+            if segment_ptr:
+                text_segments.append(segment_ptr.decode("utf-8"))
+            else:
+                logger.warning(f"Segmento {i} retornou None.")
+
+        # Concatena os segmentos para formar o texto completo
+        return ''.join(text_segments).strip()
 
     def transcribe(self, audio: np.ndarray) -> str:
         """
         Transcreve o áudio fornecido usando o modelo whisper.cpp.
 
+        O áudio é copiado uma única vez, já como float32 e entre o silêncio de
+        SILENCE_DURATION_MS, para o buffer pré-alocado de um estado livre.
+
         Args:
             audio (np.ndarray): Array NumPy contendo o áudio a ser transcrito.
 
@@ -114,57 +206,71 @@ class ASR(AbstractContextManager):
 
         # Resetar a linguagem detectada antes de cada transcrição
         self.last_detected_language = None
+        logger.info(f"Comprimento do áudio: {len(audio)} amostras")
 
-        # Verifique o comprimento do áudio
-        audio_length = len(audio)
-        logger.info(f"Comprimento do áudio: {audio_length} amostras")
+        silence_samples = int((SILENCE_DURATION_MS / 1000) * SAMPLE_RATE)
+        with self._acquire_slot() as slot:
+            padded_audio = slot.load(audio.reshape(-1), padding=silence_samples)
+            full_text = self._run(slot, self.params, padded_audio)
+
+            # Obtém o idioma detectado, se a detecção estiver ativada
+            if self.params.detect_language:
+                lang_id = whisper_cpp_wrapper.whisper_full_lang_id_from_state(slot.state)
+                if lang_id >= 0:
+                    lang_str_ptr = whisper_cpp_wrapper.whisper_lang_str(lang_id)
+                    if lang_str_ptr:
+                        self.last_detected_language = lang_str_ptr.decode('utf-8')
+                        logger.info(f"Idioma detectado: {self.last_detected_language}")
+                else:
+                    logger.warning("Não foi possível detectar o idioma.")
 
-        # Adiciona silêncio ao áudio
-        audio = self._add_silence(audio)
+        logger.info(f"Texto transcrito: {full_text}")
+        return full_text
 
-        # Verifique o novo comprimento do áudio
-        audio_length = len(audio)
-        logger.info(f"Comprimento do áudio após adicionar silêncio: {audio_length} amostras")
+    def transcribe_partial(self, audio: np.ndarray, prompt: str = "") -> str:
+        """
+        Transcreve uma janela da fala em andamento em um estado livre.
 
-        # Prepara o áudio para a transcrição
-        audio_float32 = audio.astype(np.float32)  # Certifique-se de que o áudio está em float32
-        whisper_cpp_audio = audio_float32.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+        O texto da hipótese anterior é passado como prompt inicial, o que mantém as
+        hipóteses consecutivas estáveis e acelera a decodificação do início repetido.
 
-        # Chama a função de transcrição do whisper.cpp
-        result = whisper_cpp_wrapper.whisper_full(self.ctx, self.params, whisper_cpp_audio, audio_length)
-        if result != 0:
-            raise RuntimeError(f"Erro do whisper.cpp: código de erro {result}")
+        Args:
+            audio (np.ndarray): Fala gravada até agora (16 kHz).
+            prompt (str): Hipótese parcial anterior.
 
-        # Obtém o idioma detectado, se a detecção estiver ativada
-        if self.params.detect_language:
-            lang_id = whisper_cpp_wrapper.whisper_full_lang_id(self.ctx)
-            if lang_id >= 0:
-                lang_str_ptr = whisper_cpp_wrapper.whisper_lang_str(lang_id)
-                if lang_str_ptr:
-                    self.last_detected_language = lang_str_ptr.decode('utf-8')
-                    logger.info(f"Idioma detectado: {self.last_detected_language}")
-            else:
-                logger.warning("Não foi possível detectar o idioma.")
+        Returns:
+            str: Hipótese parcial.
 
-        # Obtém o número de segmentos transcritos
-        n_segments = whisper_cpp_wrapper.whisper_full_n_segments(self.ctx)
-        logger.debug(f"Número de segmentos transcritos: {n_segments}")
+        Raises:
+            RuntimeError: Se ocorrer um erro durante a transcrição.
+        """
+        # Cópia dos parâmetros para que chamadas simultâneas não troquem de prompt
+        params = type(self.partial_params).from_buffer_copy(self.partial_params)
+        initial_prompt = whisper_cpp_wrapper.String(prompt.encode("utf-8"))
+        params.initial_prompt = initial_prompt
+        with self._acquire_slot() as slot:
+            return self._run(slot, params, slot.load(audio.reshape(-1)))
+
+    def transcribe_head(self, audio: np.ndarray, seconds: float) -> str:
+        """
+        Transcrição rápida só do início da fala, para descartar falas sem a palavra-chave
+        antes da transcrição completa.
 
-        # Extrai o texto de cada segmento
-        text_segments: List[str] = []
-        for i in range(n_segments):
-            segment_ptr = whisper_cpp_wrapper.whisper_full_get_segment_text(self.ctx, i)
-            if segment_ptr:
-                segment_text = segment_ptr.decode("utf-8")
-                text_segments.append(segment_text)
-            else:
-                logger.warning(f"Segmento {i} retornou None.")
+        O encoder roda com `audio_ctx` reduzido à duração do trecho, em vez da janela
+        fixa de 30 s, e a decodificação é gananciosa e limitada a HEAD_MAX_TOKENS.
 
-        # Concatena os segmentos para formar o texto completo
-        full_text = ''.join(text_segments).strip()
-        logger.info(f"Texto transcrito: {full_text}")
+        Args:
+            audio (np.ndarray): Fala gravada (16 kHz).
+            seconds (float): Duração do início a ser transcrito.
 
-        return full_text
+        Returns:
+            str: Texto aproximado do início da fala.
+        """
+        head = audio.reshape(-1)[:int(seconds * SAMPLE_RATE)]
+        params = type(self.head_params).from_buffer_copy(self.head_params)
+        params.audio_ctx = int(np.ceil(len(head) / SAMPLE_RATE * ENCODER_FRAMES_PER_SECOND))
+        with self._acquire_slot() as slot:
+            return self._run(slot, params, slot.load(head))
 
     def _whisper_cpp_params(
         self,
@@ -1,5 +1,6 @@
+from typing import List
 import numpy as np
-import onnxruntime as ort
+from modules.utils.onnx_session import create_session
 
 SAMPLE_RATE = 16000
 WINDOW_SIZE_SAMPLES = 512
@@ -7,6 +8,7 @@ NEG_THRESHOLD = 0.35
 THRESHOLD = 0.5
 MIN_SPEECH_DURATION_MS = 250
 MIN_SILENCE_DURATION_MS = 2000
+OFFLINE_BATCH_SIZE = 8  # Buffers processados juntos em detect_speech_batch
 
 
 class VAD:
@@ -14,21 +16,16 @@ class VAD:
     _initial_c = np.zeros((2, 1, 64)).astype("float32")
 
     def __init__(self, model_path, window_size_samples: int = int(SAMPLE_RATE / 10)):
-        self.ort_sess = ort.InferenceSession(model_path)
+        # Uma única thread que dorme entre chamadas, para não disputar núcleos com o TTS
+        self.ort_sess = create_session(model_path, "VAD", profile="light")
         self.window_size_samples = window_size_samples
         self.sr = SAMPLE_RATE
         self._h = self._initial_h
         self._c = self._initial_c
-        self.triggered = False
-        self.speeches = []
-        self.current_speech = {}
 
     def _reset_state(self):
         self._h = self._initial_h
         self._c = self._initial_c
-        self.triggered = False
-        self.speeches = []
-        self.current_speech = {}
 
     def process_chunk(self, chunk: np.ndarray) -> float:
         # Garantir que o chunk tenha o tamanho correto
@@ -61,34 +58,117 @@ class VAD:
         return np.squeeze(out)  # Remove entradas de dimensões únicas
 
     def detect_speech(self, audio: np.ndarray):
-        # Divide o áudio em chunks e processa cada chunk
-        self._reset_state()
-        speech_probs = []
-        for i in range(0, len(audio), WINDOW_SIZE_SAMPLES):
-            chunk = audio[i: i + WINDOW_SIZE_SAMPLES]
-            speech_prob = self.process_chunk(chunk)
-            speech_probs.append(speech_prob)
-            self._update_speech_status(speech_prob, i)
-
-        return self.speeches
-
-    def _update_speech_status(self, speech_prob, sample_idx):
-        neg_threshold = THRESHOLD - 0.15
-        if (speech_prob >= THRESHOLD) and not self.triggered:
-            # Detecta início da fala
-            self.triggered = True
-            self.current_speech["start"] = sample_idx
-        elif (speech_prob < neg_threshold) and self.triggered:
-            # Detecta fim da fala baseado no silêncio
-            if sample_idx - self.current_speech.get("start", 0) > MIN_SPEECH_DURATION_MS:
-                self.current_speech["end"] = sample_idx
-                self.speeches.append(self.current_speech)
-            self.current_speech = {}
-            self.triggered = False
-
-        # Checa o timeout de silêncio
-        if self.triggered and sample_idx - self.current_speech.get("start", 0) > MIN_SILENCE_DURATION_MS:
-            self.current_speech["end"] = sample_idx
-            self.speeches.append(self.current_speech)
-            self.current_speech = {}
-            self.triggered = False
+        """
+        Detecta os trechos de fala de um buffer inteiro (modo offline).
+
+        Args:
+            audio (np.ndarray): Áudio mono float32 a 16 kHz.
+
+        Returns:
+            list: Trechos {"start": amostra, "end": amostra} em ordem.
+        """
+        return self.speech_segments(self.speech_probabilities(audio))
+
+    def detect_speech_batch(self, audios: List[np.ndarray], batch_size: int = OFFLINE_BATCH_SIZE):
+        """
+        Detecta os trechos de fala de vários buffers (arquivos), processando-os juntos.
+
+        Args:
+            audios (List[np.ndarray]): Áudios mono float32 a 16 kHz.
+            batch_size (int): Quantos buffers passam juntos por cada inferência.
+
+        Returns:
+            list: Lista de trechos para cada buffer, na mesma ordem.
+        """
+        return [self.speech_segments(probs) for probs in self.speech_probabilities_batch(audios, batch_size)]
+
+    def speech_probabilities(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Probabilidade de fala de cada janela de WINDOW_SIZE_SAMPLES do buffer.
+        """
+        return self.speech_probabilities_batch([audio], batch_size=1)[0]
+
+    def speech_probabilities_batch(self, audios: List[np.ndarray], batch_size: int = OFFLINE_BATCH_SIZE) -> List[np.ndarray]:
+        """
+        Probabilidades de fala por janela para vários buffers independentes.
+
+        Cada buffer é um fluxo do lote, com seu próprio estado h/c (forma [2, B, 64]).
+        As janelas de todos os fluxos ficam em um único array pré-alocado e o dicionário
+        de entrada é reutilizado, de forma que cada passo é só uma chamada ao modelo.
+
+        Args:
+            audios (List[np.ndarray]): Áudios mono float32 a 16 kHz.
+            batch_size (int): Quantos buffers passam juntos por cada inferência.
+
+        Returns:
+            List[np.ndarray]: Probabilidades (uma por janela) de cada buffer.
+        """
+        results = []
+        for first in range(0, len(audios), batch_size):
+            group = [np.asarray(audio, dtype=np.float32).reshape(-1) for audio in audios[first:first + batch_size]]
+            n_windows = [-(-len(audio) // WINDOW_SIZE_SAMPLES) for audio in group]
+            steps = max(n_windows)
+
+            # [janela, fluxo, amostra]: frames[t] é contíguo e vai direto para o modelo
+            frames = np.zeros((steps, len(group), WINDOW_SIZE_SAMPLES), dtype=np.float32)
+            for stream, audio in enumerate(group):
+                padded = np.zeros(n_windows[stream] * WINDOW_SIZE_SAMPLES, dtype=np.float32)
+                padded[:len(audio)] = audio
+                frames[:n_windows[stream], stream] = padded.reshape(-1, WINDOW_SIZE_SAMPLES)
+
+            probs = np.empty((steps, len(group)), dtype=np.float32)
+            ort_inputs = {
+                "input": frames[0],
+                "h": np.zeros((2, len(group), 64), dtype=np.float32),
+                "c": np.zeros((2, len(group), 64), dtype=np.float32),
+                "sr": np.array(self.sr, dtype="int64"),
+            }
+            for t in range(steps):
+                ort_inputs["input"] = frames[t]
+                out, ort_inputs["h"], ort_inputs["c"] = self.ort_sess.run(None, ort_inputs)
+                probs[t] = out.reshape(-1)
+
+            results.extend(probs[:n_windows[stream], stream].copy() for stream in range(len(group)))
+        return results
+
+    def speech_segments(self, probs: np.ndarray) -> list:
+        """
+        Converte probabilidades por janela em trechos de fala, de forma vetorizada.
+
+        A fala começa quando a probabilidade chega a THRESHOLD e só termina quando cai
+        abaixo de NEG_THRESHOLD (histerese). Pausas menores que MIN_SILENCE_DURATION_MS
+        são unidas e trechos menores que MIN_SPEECH_DURATION_MS são descartados.
+
+        Args:
+            probs (np.ndarray): Probabilidade de fala de cada janela.
+
+        Returns:
+            list: Trechos {"start": amostra, "end": amostra} em ordem.
+        """
+        probs = np.asarray(probs).reshape(-1)
+        if probs.size == 0:
+            return []
+
+        # Último evento (início ou fim) até cada janela decide se ela é fala
+        events = np.full(probs.shape, -1, dtype=np.int8)
+        events[probs < NEG_THRESHOLD] = 0
+        events[probs >= THRESHOLD] = 1
+        last_event = np.maximum.accumulate(np.where(events >= 0, np.arange(probs.size), -1))
+        speaking = (last_event >= 0) & (events[np.maximum(last_event, 0)] == 1)
+
+        edges = np.diff(np.concatenate(([0], speaking.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1) * WINDOW_SIZE_SAMPLES
+        ends = np.flatnonzero(edges == -1) * WINDOW_SIZE_SAMPLES
+        if starts.size == 0:
+            return []
+
+        # Une trechos separados por pausas curtas
+        min_silence = MIN_SILENCE_DURATION_MS * self.sr // 1000
+        new_segment = np.concatenate(([True], starts[1:] - ends[:-1] >= min_silence))
+        firsts = np.flatnonzero(new_segment)
+        lasts = np.r_[firsts[1:] - 1, new_segment.size - 1]
+        starts, ends = starts[firsts], ends[lasts]
+
+        min_speech = MIN_SPEECH_DURATION_MS * self.sr // 1000
+        keep = ends - starts >= min_speech
+        return [{"start": int(start), "end": int(end)} for start, end in zip(starts[keep], ends[keep])]
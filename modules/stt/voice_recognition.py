@@ -4,13 +4,15 @@ import sounddevice as sd
 from loguru import logger
 import threading
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Callable
 from sounddevice import CallbackFlags
 import time
 from collections import deque
 
 from .ars_vad_wcpp.asr import ASR
 from .ars_vad_wcpp.vad import VAD
+from .wake_word import WakeWordMatcher
+from modules.utils.audio_utils import RingBuffer, RecordingBuffer
 import globals
 
 # Constantes
@@ -19,18 +21,26 @@ SAMPLE_RATE = 16000
 VAD_SIZE = 50  # ms
 VAD_THRESHOLD = 0.5  # Valor inicial
 PAUSE_LIMIT = 1300  # ms
-SIMILARITY_THRESHOLD = 2  # Limiar de distância de Levenshtein
 ALPHA = 0.1  # Taxa de suavização exponencial
 MEDIAN_FILTER_SIZE = 5  # Tamanho do filtro de mediana
 THRESHOLD_MULTIPLIER = 0.7  # Multiplicador para ajustar o limiar
 PRE_RECORD_BUFFER_MS = 500  # Tamanho do buffer de pré-gravação em ms
+CAPTURE_BUFFER_SECONDS = 10  # Capacidade do buffer circular entre o callback e o worker de VAD
+RECORDING_BUFFER_SECONDS = 30  # Capacidade inicial da gravação (cresce se necessário)
+PARTIAL_INTERVAL_MS = 600  # Áudio novo necessário para uma nova transcrição parcial
+MIN_PARTIAL_MS = 800  # Áudio mínimo gravado antes da primeira transcrição parcial
+PARTIAL_WAIT_S = 2.0  # Tempo máximo aguardando a parcial em andamento ao fim da fala
+WAKE_WORD_HEAD_SECONDS = 3.0  # Início da fala verificado pela checagem rápida da palavra-chave
 
 class VoiceRecognition:
     """
     Classe para reconhecimento de voz utilizando VAD (Voice Activity Detection) e ASR (Automatic Speech Recognition).
     """
 
-    def __init__(self, model_size_or_path="large-v3", device="cuda", compute_type="float16", wake_word: str | None = None):
+    def __init__(self, model_size_or_path="large-v3", device="cuda", compute_type="float16", wake_word: str | None = None,
+                 partial_transcripts: bool = True, on_partial: Callable[[str], None] | None = None,
+                 wake_word_precheck: bool = False, on_speech_start: Callable[[bool], None] | None = None,
+                 reuse_partial_final: bool = False):
         """
         Inicializa a classe VoiceRecognition com os parâmetros fornecidos.
 
@@ -39,9 +49,23 @@ class VoiceRecognition:
             device (str): Dispositivo para executar o modelo (ex.: 'cuda').
             compute_type (str): Tipo de cálculo a ser utilizado no modelo.
             wake_word (str | None): Palavra-chave para ativação do sistema de reconhecimento.
+            partial_transcripts (bool): Se True, transcreve janelas crescentes enquanto o
+                usuário ainda fala, para a especulação do LLM e a detecção antecipada da
+                palavra-chave.
+            on_partial (Callable[[str], None] | None): Chamado com cada hipótese parcial.
+            wake_word_precheck (bool): Se True, transcreve rapidamente só o início da fala
+                e descarta falas sem a palavra-chave antes da transcrição completa.
+            on_speech_start (Callable[[bool], None] | None): Chamado uma vez por fala, assim que
+                ela é confirmada (primeira parcial com texto e com a palavra-chave, se houver),
+                para que a resposta em andamento possa ser interrompida. Recebe True se a
+                palavra-chave foi reconhecida na fala.
+            reuse_partial_final (bool): Se True, a última parcial vira a transcrição final
+                quando já cobre toda a fala, poupando a transcrição completa. As parciais usam
+                busca gananciosa, então isso troca precisão por latência.
         """
         self.wake_word = wake_word
-        self.samples: List[np.ndarray] = []
+        self.wake_word_matcher = WakeWordMatcher(wake_word or "")
+        self.wake_word_precheck = wake_word_precheck
         globals.recording_started = False
         self.gap_counter = 0
         self.shutdown_event = threading.Event()
@@ -51,27 +75,60 @@ class VoiceRecognition:
         self.confidence_deque = deque(maxlen=MEDIAN_FILTER_SIZE)
         self.smoothed_confidence = None  # Para a média móvel exponencial
 
-        # Buffer de pré-gravação
-        self.buffer = deque(maxlen=int(PRE_RECORD_BUFFER_MS / VAD_SIZE))
+        # Gravação contígua com o buffer de pré-gravação embutido
+        self.recording = RecordingBuffer(
+            pre_roll=SAMPLE_RATE * PRE_RECORD_BUFFER_MS // 1000,
+            capacity=SAMPLE_RATE * RECORDING_BUFFER_SECONDS,
+        )
 
-        # Fila para comunicação entre o callback e a função de processamento
+        # Fila para comunicação entre o worker de VAD e a função de processamento
         self.sample_queue = queue.Queue()
 
+        # Buffer circular pré-alocado: o callback só copia o bloco para cá e o worker
+        # de VAD consome na ordem, fora da thread do PortAudio
+        self.block_size = int(SAMPLE_RATE * VAD_SIZE / 1000)
+        self.capture_ring = RingBuffer(SAMPLE_RATE * CAPTURE_BUFFER_SECONDS, channels=1)
+        self.frames_ready = threading.Event()
+        self.vad_thread = None
+        self.input_overflows = 0  # Blocos em que o PortAudio relatou overflow de entrada
+        self.dropped_frames = 0  # Frames descartados porque o worker de VAD ficou para trás
+
         # Configuração de entrada de áudio
         self.input_stream = sd.InputStream(
             samplerate=SAMPLE_RATE,
             channels=1,
+            dtype="float32",
             callback=self.audio_callback,
-            blocksize=int(SAMPLE_RATE * VAD_SIZE / 1000),
+            blocksize=self.block_size,
         )
 
         # Inicialização dos modelos
         self.vad_model = VAD(model_path=str(Path.cwd() / "models" / VAD_MODEL_PATH))
         self.asr_model = ASR(model=str(Path.cwd() / "models" / model_size_or_path))
 
+        # Transcrição parcial: uma thread própria, com estado whisper separado, recebe
+        # sempre a janela mais recente da fala em andamento
+        self.partial_transcripts = partial_transcripts
+        self.on_partial = on_partial
+        self.partial_text = ""  # Última hipótese parcial
+        self.partial_samples = 0  # Amostras cobertas pela última hipótese parcial
+        self.requested_samples = 0  # Amostras cobertas pelo último pedido de parcial
+        self.utterance_id = 0  # Descarta parciais de falas anteriores
+        self.utterance_lock = threading.Lock()  # Troca de fala (reset) x publicação de parcial
+        self.wake_word_heard = False
+        self.on_speech_start = on_speech_start
+        self.reuse_partial_final = reuse_partial_final and partial_transcripts
+        self.speech_confirmed = False  # on_speech_start já foi chamado para esta fala
+        self.partial_requests = queue.Queue(maxsize=1)
+        self.partial_idle = threading.Event()
+        self.partial_idle.set()
+        if self.partial_transcripts:
+            threading.Thread(target=self.partial_worker, name="partial_asr", daemon=True).start()
+
     def audio_callback(self, indata: np.ndarray, frames: int, time_info: Any, status: CallbackFlags):
         """
-        Callback de áudio utilizado para processar áudio em tempo real.
+        Callback de áudio: apenas copia o bloco para o buffer circular e acorda o worker
+        de VAD. Não há inferência, alocação nem log na thread do PortAudio.
 
         Args:
             indata (np.ndarray): Dados de entrada do áudio.
@@ -79,10 +136,41 @@ class VoiceRecognition:
             time_info (Any): Tempo de áudio.
             status (CallbackFlags): Status da entrada de áudio.
         """
-        if status:
-            logger.warning(f"Audio callback status: {status}")
+        if status.input_overflow:
+            self.input_overflows += 1
+        written = self.capture_ring.write(indata)
+        if written < frames:
+            self.dropped_frames += frames - written
+        self.frames_ready.set()
+
+    def vad_worker(self):
+        """
+        Consome os blocos capturados em ordem, calcula a confiança do VAD e o limiar
+        dinâmico e os envia para `sample_queue`, até `shutdown_event` ser sinalizado.
+        """
+        block = np.zeros((self.block_size, 1), dtype=np.float32)
+        reported = (0, 0)
+        while not self.shutdown_event.is_set():
+            self.frames_ready.clear()
+            if self.capture_ring.available < self.block_size:
+                self.frames_ready.wait(timeout=0.1)
+                continue
+            self.capture_ring.read_into(block)
+            self.process_block(block[:, 0].copy())
+
+            counters = (self.input_overflows, self.dropped_frames)
+            if counters != reported:
+                logger.warning(f"Audio capture: {counters[0]} input overflows, {counters[1]} frames dropped")
+                reported = counters
+
+    def process_block(self, data: np.ndarray):
+        """
+        Calcula a confiança do VAD de um bloco, atualiza o limiar dinâmico e envia o
+        bloco para a fila de processamento.
 
-        data = indata.copy().squeeze()
+        Args:
+            data (np.ndarray): Bloco de áudio mono.
+        """
         vad_confidence = self.vad_model.process_chunk(data)
 
         # Atualiza o valor suavizado exponencialmente
@@ -97,12 +185,80 @@ class VoiceRecognition:
             median_confidence = np.median(self.confidence_deque)
             self.dynamic_threshold = median_confidence * THRESHOLD_MULTIPLIER
 
-        # Armazena o áudio no buffer de pré-gravação
-        self.buffer.append(data)
-
         # Envia os dados para a fila
         self.sample_queue.put((data, vad_confidence))
 
+    def capture_stats(self) -> dict:
+        """
+        Contadores da captura de áudio.
+
+        Returns:
+            dict: Overflows relatados pelo PortAudio, frames descartados por falta de
+                espaço no buffer circular e frames aguardando o worker de VAD.
+        """
+        return {
+            "input_overflows": self.input_overflows,
+            "dropped_frames": self.dropped_frames,
+            "pending_frames": self.capture_ring.available,
+        }
+
+    def request_partial(self):
+        """
+        Pede a transcrição parcial de toda a fala gravada até agora, substituindo um
+        pedido anterior que ainda não tenha começado.
+        """
+        # Cópia: o buffer é reaproveitado pela próxima fala enquanto a parcial é transcrita
+        audio = self.recording.view().copy()
+        try:
+            self.partial_requests.get_nowait()
+        except queue.Empty:
+            pass
+        self.partial_idle.clear()
+        self.requested_samples = len(audio)
+        self.partial_requests.put_nowait((self.utterance_id, audio))
+
+    def partial_worker(self):
+        """
+        Transcreve as janelas pedidas usando a hipótese anterior como prompt, publica a
+        hipótese parcial e verifica a palavra-chave antecipadamente.
+        """
+        while True:
+            utterance_id, audio = self.partial_requests.get()
+            try:
+                text = self.asr_model.transcribe_partial(audio, prompt=self.partial_text)
+                with self.utterance_lock:
+                    # A fala pode ter terminado (reset) durante a transcrição
+                    if utterance_id != self.utterance_id or not text:
+                        continue
+                    self.partial_text = text
+                    self.partial_samples = len(audio)
+                    logger.debug(f"Partial: '{text}'")
+                    if self.wake_word and not self.wake_word_heard and self.wakeword_detected(text):
+                        self.wake_word_heard = True
+                        logger.info("Wake word heard in partial transcript.")
+                    if not self.wake_word or self.wake_word_heard:
+                        self.confirm_speech(self.wake_word_heard)
+                    if self.on_partial:
+                        self.on_partial(text)
+            except Exception as e:
+                logger.warning(f"Partial transcription failed: {e}")
+            finally:
+                if self.partial_requests.empty():
+                    self.partial_idle.set()
+
+    def confirm_speech(self, wake_word_heard: bool = False):
+        """
+        Avisa `on_speech_start` na primeira confirmação de que a fala é do usuário.
+
+        Args:
+            wake_word_heard (bool): Se a palavra-chave foi reconhecida na fala.
+        """
+        if self.speech_confirmed:
+            return
+        self.speech_confirmed = True
+        if self.on_speech_start:
+            self.on_speech_start(wake_word_heard)
+
     def wakeword_detected(self, text: str) -> bool:
         """
         Verifica se a palavra-chave (wake word) está presente no texto reconhecido.
@@ -113,22 +269,12 @@ class VoiceRecognition:
         Returns:
             bool: True se a palavra-chave for detectada, False caso contrário.
         """
-        if not self.wake_word:
+        if not self.wake_word_matcher:
             return False
 
-        # Converta a string das wakewords em uma lista, se necessário
-        if isinstance(self.wake_word, str):
-            self.wake_word = self.wake_word.split(',')  # Separa a string em uma lista de palavras
-
-        # Encontre a menor distância entre as palavras no texto e qualquer uma das wake words
-        closest_distance = min(
-            self.distance(word.lower(), wake_word.lower())
-            for word in text.split()
-            for wake_word in self.wake_word
-        )
-
+        phrase, closest_distance = self.wake_word_matcher.closest(text)
         logger.info(f"closest_distance: {closest_distance}")
-        return closest_distance <= SIMILARITY_THRESHOLD
+        return phrase is not None
 
     def listen_for_voice(self, timeout=None):
         """
@@ -137,53 +283,61 @@ class VoiceRecognition:
         Returns:
             str: Texto reconhecido, caso a palavra-chave seja detectada.
         """
+        self.shutdown_event.clear()
+        self.vad_thread = threading.Thread(target=self.vad_worker, name="vad_worker", daemon=True)
+        self.vad_thread.start()
         self.input_stream.start()
         try:
             while True:
-                if not self.sample_queue.empty():
-                    data, vad_confidence = self.sample_queue.get()
-
-                    # Verifica se a gravação deve começar
-                    if not globals.recording_started and vad_confidence > self.dynamic_threshold:
-                        globals.recording_started = True
-                        self.gap_counter = 0  # Reseta o contador de pausas
-
-                        # Armazena o áudio prévio do buffer
-                        pre_record_audio = list(self.buffer)
-                        self.samples.extend(pre_record_audio)
-                        self.samples.append(data)
-                    elif globals.recording_started:
-                        self.samples.append(data)
-
-                        if vad_confidence <= self.dynamic_threshold:
-                            self.gap_counter += VAD_SIZE
-                        else:
-                            self.gap_counter = 0  # Reseta o contador de gaps se a confiança subir
-
-                        # Processa o áudio se o contador de gaps exceder o limite de pausa
-                        if self.gap_counter > PAUSE_LIMIT:
-                            detected_text = self._process_detected_audio()
-                            if detected_text:
-                                return detected_text
-                            else:
-                                # Reseta para próxima captura
-                                self.reset()
-                    else:
-                        # Continua monitorando sem gravar
-                        pass
+                # Bloqueia até o callback entregar o próximo bloco, sem polling
+                data, vad_confidence = self.sample_queue.get()
+
+                # Verifica se a gravação deve começar
+                if not globals.recording_started and vad_confidence > self.dynamic_threshold:
+                    globals.recording_started = True
+                    self.gap_counter = 0  # Reseta o contador de pausas
+
+                    # A gravação começa com o áudio prévio, que já inclui este bloco
+                    self.recording.feed_pre_roll(data)
+                    self.recording.start()
+                elif not globals.recording_started:
+                    # Armazena o áudio no buffer de pré-gravação
+                    self.recording.feed_pre_roll(data)
                 else:
-                    # Adiciona um pequeno delay para evitar uso excessivo de CPU
-                    time.sleep(0.01)
+                    self.recording.append(data)
 
-                # Continua capturando áudio mesmo se estiver esperando
-                if globals.recording_started and self.gap_counter <= PAUSE_LIMIT:
-                    continue  # Continua capturando áudio
+                    if vad_confidence <= self.dynamic_threshold:
+                        self.gap_counter += VAD_SIZE
+                        # Início da pausa: transcreve tudo enquanto a pausa é confirmada
+                        if self.partial_transcripts and self.gap_counter == VAD_SIZE:
+                            self.request_partial()
+                    else:
+                        self.gap_counter = 0  # Reseta o contador de gaps se a confiança subir
+                        new_samples = len(self.recording) - self.requested_samples
+                        if (
+                            self.partial_transcripts
+                            and len(self.recording) >= MIN_PARTIAL_MS * SAMPLE_RATE // 1000
+                            and new_samples >= PARTIAL_INTERVAL_MS * SAMPLE_RATE // 1000
+                        ):
+                            self.request_partial()
+
+                    # Processa o áudio se o contador de gaps exceder o limite de pausa
+                    if self.gap_counter > PAUSE_LIMIT:
+                        detected_text = self._process_detected_audio()
+                        if detected_text:
+                            return detected_text
+                        else:
+                            # Reseta para próxima captura
+                            self.reset()
         except KeyboardInterrupt:
             logger.info("Interrupted by user, stopping...")
             return None
         finally:
             self.shutdown_event.set()
             self.input_stream.stop()
+            self.vad_thread.join()
+            # Descarta o que sobrou da captura para a próxima escuta começar do zero
+            self.capture_ring.read_pos = self.capture_ring.write_pos
             self.reset()
 
     def _process_detected_audio(self) -> str | None:
@@ -195,19 +349,35 @@ class VoiceRecognition:
         """
         logger.info("Processing detected audio...")
 
-        if not self.samples:
+        if not len(self.recording):
             logger.warning("No samples available, skipping processing.")
             return None
 
-        final_audio = np.concatenate(self.samples)
-        detected_text = self.asr_model.transcribe(final_audio)
+        # Opcional: se a última parcial já cobre toda a fala (até o início da pausa), ela é a final
+        speech_end = len(self.recording) - self.gap_counter * SAMPLE_RATE // 1000
+        if self.reuse_partial_final:
+            self.partial_idle.wait(timeout=PARTIAL_WAIT_S)
+        if self.reuse_partial_final and self.partial_text and self.partial_samples >= speech_end:
+            logger.info("Reusing partial transcript as final.")
+            detected_text = self.partial_text
+        else:
+            final_audio = self.recording.view()
+            # Descarta a fala sem a palavra-chave antes de pagar a transcrição completa
+            if self.wake_word_precheck and self.wake_word_matcher and not self.wake_word_heard:
+                head_text = self.asr_model.transcribe_head(final_audio, WAKE_WORD_HEAD_SECONDS)
+                if not self.wakeword_detected(head_text):
+                    logger.info(f"Wake word '{self.wake_word}' not heard in '{head_text}', skipping transcription.")
+                    return None
+            detected_text = self.asr_model.transcribe(final_audio)
 
         if detected_text:
             logger.info(f"Detected: '{detected_text}'")
-            if self.wake_word and not self.wakeword_detected(detected_text):
+            if self.wake_word and not (self.wake_word_heard or self.wakeword_detected(detected_text)):
                 logger.info(f"Wake word '{self.wake_word}' not detected.")
                 return None
             else:
+                # Com palavra-chave configurada, chegar aqui significa que ela foi reconhecida
+                self.confirm_speech(bool(self.wake_word))
                 return detected_text
         else:
             logger.info("No text detected.")
@@ -218,11 +388,21 @@ class VoiceRecognition:
         Reseta o estado completo do sistema de reconhecimento de voz.
         """
         globals.recording_started = False
-        self.samples.clear()
+        self.recording.clear()
         self.gap_counter = 0
+        with self.utterance_lock:
+            self.utterance_id += 1
+            self.partial_text = ""
+            self.partial_samples = 0
+            self.requested_samples = 0
+            self.wake_word_heard = False
+            self.speech_confirmed = False
+        try:
+            self.partial_requests.get_nowait()
+        except queue.Empty:
+            pass
         self.dynamic_threshold = VAD_THRESHOLD  # Reinicia o threshold dinâmico para o padrão
         self.confidence_deque.clear()
-        self.buffer.clear()
         # Limpa a fila de samples
         try:
             while True:
@@ -231,37 +411,6 @@ class VoiceRecognition:
             pass
 
 
-    # Função auxiliar para calcular a distância de Levenshtein
-    @staticmethod
-    def distance(a: str, b: str) -> int:
-        """
-        Calcula a distância de Levenshtein entre duas strings.
-
-        Args:
-            a (str): Primeira string.
-            b (str): Segunda string.
-
-        Returns:
-            int: Distância de Levenshtein.
-        """
-        if len(a) < len(b):
-            return VoiceRecognition.distance(b, a)
-
-        if len(b) == 0:
-            return len(a)
-
-        previous_row = range(len(b) + 1)
-        for i, c1 in enumerate(a):
-            current_row = [i + 1]
-            for j, c2 in enumerate(b):
-                insertions = previous_row[j + 1] + 1  # Inserção
-                deletions = current_row[j] + 1       # Deleção
-                substitutions = previous_row[j] + (c1 != c2)  # Substituição
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-
-        return previous_row[-1]
-
 # Exemplo de uso
 if __name__ == "__main__":
     vr = VoiceRecognition(wake_word="assistente")
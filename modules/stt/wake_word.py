@@ -0,0 +1,183 @@
+import re
+import unicodedata
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from rapidfuzz.distance import Levenshtein as _rapidfuzz_levenshtein
+except ImportError:
+    _rapidfuzz_levenshtein = None
+
+SIMILARITY_THRESHOLD = 2  # Distância de Levenshtein mínima aceita por palavra-chave
+CHARS_PER_EDIT = 6  # Frases longas ganham uma edição a cada 6 caracteres
+
+# Regras fonéticas aplicadas em ordem, para que grafias que soam igual
+# ("glados", "gladdos", "gladoss") fiquem iguais antes da distância
+PHONETIC_RULES = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck"), "k"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"(?<=[^aeiou\s])h"), ""),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+NON_WORD = re.compile(r"[^a-z0-9\s]")
+
+def normalize(text: str) -> str:
+    """
+    Converte o texto para a forma comparada: minúsculas, sem acentos nem pontuação
+    e com as regras fonéticas aplicadas.
+
+    Args:
+        text (str): Texto reconhecido ou palavra-chave.
+
+    Returns:
+        str: Palavras normalizadas separadas por um espaço.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = NON_WORD.sub(" ", text)
+    for pattern, replacement in PHONETIC_RULES:
+        text = pattern.sub(replacement, text)
+    return " ".join(text.split())
+
+def bounded_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Distância de Levenshtein limitada: retorna `max_distance + 1` assim que fica
+    claro que a distância passa do limite.
+
+    Args:
+        a (str): Primeira string.
+        b (str): Segunda string.
+        max_distance (int): Maior distância que interessa.
+
+    Returns:
+        int: Distância, ou `max_distance + 1` se ela for maior que o limite.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if _rapidfuzz_levenshtein is not None:
+        return _rapidfuzz_levenshtein.distance(a, b, score_cutoff=max_distance)
+
+    if len(a) < len(b):
+        a, b = b, a
+    previous_row = list(range(len(b) + 1))
+    for i, c1 in enumerate(a):
+        current_row = [i + 1]
+        for j, c2 in enumerate(b):
+            current_row.append(min(
+                previous_row[j + 1] + 1,  # Inserção
+                current_row[j] + 1,  # Deleção
+                previous_row[j] + (c1 != c2),  # Substituição
+            ))
+        # Nenhuma célula da linha cabe no limite: o resultado também não caberá
+        if min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+    return min(previous_row[-1], max_distance + 1)
+
+class WakeWordMatcher:
+    """
+    Verifica se uma ou mais palavras-chave (inclusive frases de várias palavras)
+    aparecem no texto reconhecido.
+
+    As palavras-chave são normalizadas uma única vez na criação. Cada frase aceita
+    `SIMILARITY_THRESHOLD` edições, ou uma a cada `CHARS_PER_EDIT` caracteres se for
+    longa. Cada frase de N palavras é comparada palavra a palavra com as janelas de
+    N palavras do texto, e sem espaços com as janelas de N-1 e N+1 palavras, para
+    tolerar o ASR juntar ou separar palavras ("hey glados" x "heyglados"). Em frases
+    de várias palavras, cada palavra também tem um limite próprio, para que uma
+    palavra curta qualquer não substitua outra ("the computer" x "hey computer").
+    """
+
+    def __init__(self, wake_words: str | Sequence[str], max_distance: Optional[int] = None):
+        """
+        Args:
+            wake_words (str | Sequence[str]): Palavras-chave, em lista ou separadas por vírgula.
+            max_distance (int, optional): Distância de Levenshtein máxima aceita para todas
+                as frases. Por padrão, `SIMILARITY_THRESHOLD` ou proporcional ao tamanho
+                de cada uma, o que for maior.
+        """
+        if isinstance(wake_words, str):
+            wake_words = wake_words.split(",")
+        # (original, normalizada sem espaços, palavras normalizadas, distância máxima)
+        self.phrases: List[Tuple[str, str, Tuple[str, ...], int]] = []
+        for phrase in wake_words:
+            normalized = normalize(phrase)
+            if normalized:
+                key = normalized.replace(" ", "")
+                limit = max_distance if max_distance is not None else max(SIMILARITY_THRESHOLD, len(key) // CHARS_PER_EDIT)
+                self.phrases.append((phrase.strip(), key, tuple(normalized.split()), limit))
+        self.max_distance = max((limit for *_, limit in self.phrases), default=0)
+        self.max_words = max((len(words) for _, _, words, _ in self.phrases), default=0) + 1
+
+    def __bool__(self):
+        return bool(self.phrases)
+
+    def closest(self, text: str) -> Tuple[Optional[str], int]:
+        """
+        Procura a palavra-chave mais próxima no texto.
+
+        Args:
+            text (str): Texto reconhecido pelo ASR.
+
+        Returns:
+            Tuple[Optional[str], int]: Palavra-chave encontrada (ou None) e a menor
+                distância vista, limitada a `max_distance + 1`.
+        """
+        words = normalize(text).split()
+        best_phrase, best_distance = None, self.max_distance + 1
+        for start in range(len(words)):
+            for size in range(1, min(self.max_words, len(words) - start) + 1):
+                window = words[start:start + size]
+                for phrase, key, phrase_words, limit in self.phrases:
+                    if abs(size - len(phrase_words)) > 1:
+                        continue
+                    if size == len(phrase_words):
+                        distance = self._word_distance(window, phrase_words, limit)
+                    else:
+                        distance = bounded_distance("".join(window), key, limit)
+                    if distance <= limit and distance < best_distance:
+                        best_phrase, best_distance = phrase, distance
+                        if distance == 0:
+                            return best_phrase, 0
+        return best_phrase, best_distance
+
+    @staticmethod
+    def _word_distance(window: List[str], phrase_words: Tuple[str, ...], limit: int) -> int:
+        """
+        Soma as distâncias palavra a palavra. Numa frase de várias palavras, cada palavra
+        também precisa ficar dentro do próprio limite: `SIMILARITY_THRESHOLD` ou o
+        proporcional ao tamanho, e nunca mais que metade das letras ("the" não vira "hey").
+
+        Returns:
+            int: Distância total, ou `limit + 1` se passar de algum limite.
+        """
+        if len(phrase_words) == 1:
+            return bounded_distance(window[0], phrase_words[0], limit)
+        total = 0
+        for word, target in zip(window, phrase_words):
+            word_limit = min(
+                limit - total,
+                max(SIMILARITY_THRESHOLD, len(target) // CHARS_PER_EDIT),
+                max(1, len(target) // 2),
+            )
+            distance = bounded_distance(word, target, word_limit)
+            if distance > word_limit:
+                return limit + 1
+            total += distance
+        return total
+
+    def matches(self, text: str) -> bool:
+        """
+        Args:
+            text (str): Texto reconhecido pelo ASR.
+
+        Returns:
+            bool: True se alguma palavra-chave estiver no texto.
+        """
+        return self.closest(text)[0] is not None
@@ -44,14 +44,6 @@ speed = 1.0
 fix_duration = None
 
 # -----------------------------------------
-import threading
-import queue
-import sounddevice as sd
-
-# Define a fila para armazenamento dos batches prontos para reprodução
-audio_queue = queue.Queue()
-
-playback_thread = None  # Variável global para controlar a thread de reprodução
 
 # Exemplo da função de remoção de silêncio com ffmpeg
 def remove_silence_ffmpeg(input_path: str, output_path: str, threshold: float = -50.0, duration: float = 1.0):
@@ -74,39 +66,6 @@ def remove_silence_ffmpeg(input_path: str, output_path: str, threshold: float =
     ]
     subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
 
-def play_audio_continuous():
-    """Reproduz segmentos de áudio da fila continuamente, concatenando-os para evitar cortes."""
-    stream = sd.OutputStream(samplerate=target_sample_rate, channels=1)
-    stream.start()
-
-    while True:
-        audio_data, sample_rate = audio_queue.get()
-        
-        # Sinal de término
-        if audio_data is None:
-            break
-
-        # Reproduz o áudio do batch atual
-        stream.write(audio_data.astype(np.float32))
-        audio_queue.task_done()
-
-    stream.stop()
-    stream.close()
-
-def start_playback_thread():
-    """Inicia a thread de reprodução, encerrando a thread anterior se necessário."""
-    global playback_thread
-
-    # Encerra a thread anterior, se estiver ativa
-    if playback_thread is not None and playback_thread.is_alive():
-        audio_queue.put((None, None))  # Sinaliza fim para a thread de reprodução
-        playback_thread.join()  # Aguarda a finalização
-
-    # Cria e inicia uma nova thread de reprodução
-    playback_thread = threading.Thread(target=play_audio_continuous)
-    playback_thread.start()
-
-
 # chunk text into smaller pieces
 
 
@@ -337,9 +296,6 @@ def infer_batch_process(
     fix_duration=None,
     device=None,
 ):
-    # Inicia a thread de reprodução sempre que a função é chamada
-    start_playback_thread()
-
     audio, sr = ref_audio
     if audio.shape[0] > 1:
         audio = torch.mean(audio, dim=0, keepdim=True)
@@ -392,16 +348,10 @@ def infer_batch_process(
         # Converte o áudio para numpy
         generated_wave = generated_wave.squeeze().cpu().numpy()
 
-        # Coloca o batch atual na fila para reprodução
-        audio_queue.put((generated_wave, target_sample_rate))
-
         # Salva o segmento gerado para combinação final
         generated_waves.append(generated_wave)
         spectrograms.append(generated_mel_spec[0].cpu().numpy())
 
-    # Sinaliza o fim da fila para a thread de reprodução
-    audio_queue.put((None, None))
-
     # Combine todos os batches gerados com cross-fade
     if cross_fade_duration <= 0:
         final_wave = np.concatenate(generated_waves)
@@ -12,6 +12,7 @@ from faster_whisper import WhisperModel
 
 from .F5.model import DiT, UNetT
 from .F5.model.utils import save_spectrogram, seed_everything
+from modules.utils.audio_utils import estimate_word_timings
 from .F5.model.utils_infer import (
     load_vocoder,
     load_model,
@@ -22,6 +23,8 @@ from .F5.model.utils_infer import (
 # For systems that don't support symlinks properly
 os.environ["HF_HUB_DISABLE_SYMLINKS"] = "true"
 
+REFERENCE_AUDIO = "modules/tts/F5/audiofiles/Portal 2 - All Cave Johnson Quotes Chopped.wav"
+
 
 class F5TTS:
     """
@@ -57,6 +60,8 @@ class F5TTS:
         self.hop_length = 256
         self.target_rms = 0.1
         self.seed = -1
+        self.model_type = model_type
+        self.ckpt_file = ckpt_file
 
         self.device = device or (
             "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
@@ -172,10 +177,18 @@ class F5TTS:
         Args:
             gen_text (str): Text to be synthesized.
         """
+        ref_audio, ref_text = self.reference()
+        audio, sr, *_ = self.infer(ref_audio, ref_text, gen_text)
+        return audio, sr
 
-        audiofile="Portal 2 - All Cave Johnson Quotes Chopped.wav"
+    def reference(self):
+        """
+        Return the reference audio path and its transcription, transcribing it on first use.
 
-        ref_audio = os.path.abspath(f"modules/tts/F5/audiofiles/{audiofile}")
+        Returns:
+            tuple: (reference audio path, reference text)
+        """
+        ref_audio = os.path.abspath(REFERENCE_AUDIO)
         if not os.path.exists(ref_audio):
             raise FileNotFoundError(f"Missing reference audio: {ref_audio}")
 
@@ -187,8 +200,37 @@ class F5TTS:
             with open(toml_path, "r", encoding="utf-8") as f:
                 data = toml.load(f)
                 ref_text = data.get("transcription", "")
-        audio, sr, *_ = self.infer(ref_audio, ref_text, gen_text)
-        return audio, sr
+        return ref_audio, ref_text
+
+    def cache_identity(self):
+        """Settings besides the text that change the generated audio, for the audio cache."""
+        ref_audio, ref_text = self.reference()
+        stat = os.stat(ref_audio)
+        return {
+            "model_type": self.model_type,
+            "ckpt_file": self.ckpt_file,
+            "reference_audio": ref_audio,
+            "reference_size": stat.st_size,
+            "reference_mtime_ns": stat.st_mtime_ns,
+            "reference_text": ref_text,
+        }
+
+    def word_timings(self, gen_text, audio, sr):
+        """
+        Map each word to the sample where it ends in the generated audio.
+
+        F5-TTS sizes its output proportionally to the UTF-8 length of the text,
+        so the same proportion gives the position of each word.
+
+        Args:
+            gen_text (str): Synthesized text.
+            audio (np.ndarray): Generated waveform.
+            sr (int): Sample rate of the waveform.
+
+        Returns:
+            list: (word, end sample) pairs.
+        """
+        return estimate_word_timings(gen_text, len(audio))
     
 
 
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+MEMORY_LIMIT_MB = 64  # Decoded audio kept in RAM
+DISK_LIMIT_MB = 512  # Audio kept in the on-disk tier
+CACHE_FILE = re.compile(r"^(?P<key>[0-9a-f]+)_(?P<rate>\d+)\.npy$")
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different sentences share an entry."""
+    return " ".join(text.split())
+
+class AudioCache:
+    """
+    Content-addressed cache of synthesized speech.
+
+    Entries are keyed by a hash of the provider identity (provider, model,
+    voice/speaker, synthesis params) and the normalized text. Hits are served
+    from an in-memory LRU first, then from `.npy` files on disk, which are
+    memory-mapped on read and promoted to memory. Both tiers are bounded in
+    bytes and evict the least recently used entries.
+    """
+
+    def __init__(self, cache_dir: Optional[str], identity: dict, memory_limit_mb: float = MEMORY_LIMIT_MB, disk_limit_mb: float = DISK_LIMIT_MB):
+        """
+        Args:
+            cache_dir (str, optional): Directory of the disk tier, None for memory only.
+            identity (dict): Everything besides the text that changes the audio.
+            memory_limit_mb (float): Size limit of the memory tier.
+            disk_limit_mb (float): Size limit of the disk tier.
+        """
+        self.cache_dir = cache_dir
+        self.identity = json.dumps(identity, sort_keys=True, default=str)
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self.disk_limit = int(disk_limit_mb * 1024 * 1024)
+        self.memory = OrderedDict()  # key -> (audio, rate)
+        self.memory_bytes = 0
+        self.disk = OrderedDict()  # key -> (path, rate, size), least recently used first
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """Indexes the files already on disk, oldest access first."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            match = CACHE_FILE.match(entry.name)
+            if match:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, match["key"], entry.path, int(match["rate"]), stat.st_size))
+        for _, key, path, rate, size in sorted(entries):
+            self.disk[key] = (path, rate, size)
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def key(self, text: str) -> str:
+        """Returns the cache key of a sentence for this provider identity."""
+        data = f"{self.identity}\n{normalize_text(text)}".encode("utf-8")
+        if xxhash is not None:
+            return xxhash.xxh3_128_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get(self, text: str) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Looks a sentence up in memory, then on disk.
+
+        Returns:
+            Optional[Tuple[np.ndarray, int]]: (audio, rate), or None on a miss.
+        """
+        key = self.key(text)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+            disk_entry = self.disk.get(key)
+
+        if disk_entry is not None:
+            path, rate, _ = disk_entry
+            try:
+                audio = np.load(path, mmap_mode="r")
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                # Also covers a file evicted by another thread since the lookup
+                logging.warning(f"Dropping unreadable TTS cache file {path}: {e}")
+                self._remove_disk(key)
+            else:
+                with self.lock:
+                    if key in self.disk:
+                        self.disk.move_to_end(key)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._put_memory(key, audio, rate)
+                return audio, rate
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, audio: np.ndarray, rate: int):
+        """Stores freshly synthesized audio in both tiers."""
+        if audio is None or not len(audio) or not rate:
+            return
+        key = self.key(text)
+        audio = np.ascontiguousarray(audio)
+        with self.lock:
+            self._put_memory(key, audio, rate)
+        if not self.cache_dir or key in self.disk:
+            return
+
+        path = os.path.join(self.cache_dir, f"{key}_{int(rate)}.npy")
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                np.save(file, audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write TTS cache file {path}: {e}")
+            return
+        with self.lock:
+            size = os.path.getsize(path)
+            self.disk[key] = (path, int(rate), size)
+            self.disk_bytes += size
+            self._evict_disk()
+
+    def _put_memory(self, key: str, audio: np.ndarray, rate: int):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        if audio.nbytes > self.memory_limit:
+            return
+        self.memory[key] = (audio, rate)
+        self.memory_bytes += audio.nbytes
+        while self.memory_bytes > self.memory_limit:
+            _, (evicted, _) = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted.nbytes
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.disk_limit and self.disk:
+            key, (path, _, size) = self.disk.popitem(last=False)
+            self.disk_bytes -= size
+            cached = self.memory.pop(key, None)
+            if cached is not None:
+                self.memory_bytes -= cached[0].nbytes
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remove_disk(self, key: str):
+        with self.lock:
+            entry = self.disk.pop(key, None)
+            if entry:
+                self.disk_bytes -= entry[2]
+        if entry:
+            try:
+                os.remove(entry[0])
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the size of each tier."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_mb": self.memory_bytes / (1024 * 1024),
+            "disk_entries": len(self.disk),
+            "disk_mb": self.disk_bytes / (1024 * 1024),
+        }
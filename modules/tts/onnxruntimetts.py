@@ -1,14 +1,19 @@
+from collections import OrderedDict
 from dataclasses import dataclass
-import re
-import subprocess
 from typing import Any, Dict, List, Mapping, Optional, Sequence
 import json
-import onnxruntime
+import logging
 import numpy as np
+from modules.utils.audio_utils import estimate_word_timings, get_audio_player
+from modules.tts.phonemizer import Phonemizer
+from modules.utils.onnx_session import create_session
 #from modules.tts.tts_base import TTSBase
 
 # Constants
 MAX_WAV_VALUE = 32767.0
+HOP_LENGTH = 256  # Samples generated per phoneme duration frame
+DURATION_OUTPUTS = ("durations", "w_ceil", "phoneme_durations")
+RECENT_SYNTHESIS_SIZE = 32  # Sentences whose phonemes/durations are kept for word_timings
 
 # Settings
 MODEL_PATH = "./models/glados.onnx"
@@ -60,13 +65,38 @@ class PiperConfig:
             speaker_id_map=config.get("speaker_id_map", {}),
         )
     
+@dataclass
+class BatchPolicy:
+    """How sentences are grouped into a single ONNX run"""
+
+    max_batch: int = 8
+    """Maximum number of sentences per InferenceSession.run"""
+
+    max_latency_ms: float = 0.0
+    """How long a streaming caller may wait for more sentences before running a batch"""
+
+    max_padding_ratio: float = 2.0
+    """Sentences are not batched with others more than this many times their length"""
+
 class OnnxTTS():
-    def __init__(self, model_path: str, use_cuda: bool = True, speaker_id: int = 0):
+    def __init__(self, model_path: str, use_cuda: bool = True, speaker_id: int = 0, batch_policy: BatchPolicy | None = None):
         self.model_path = model_path
         self.use_cuda = use_cuda
         self.speaker_id = speaker_id
         self.engine = self.start_onnx_model()  # Equivalent to engine initialization in pyttsx3
+        # Padded batch rows can only be cut back to their own length with the predicted
+        # durations, so models without them synthesize one sentence per run
+        self.duration_output = next(
+            (meta.name for meta in self.engine.get_outputs()[1:] if meta.name in DURATION_OUTPUTS), None
+        )
+        if self.duration_output is None:
+            logging.info("TTS model does not export phoneme durations, batching disabled.")
+            self.batch_policy = None
+        else:
+            self.batch_policy = batch_policy or BatchPolicy()
         self.rate = self.config.sample_rate
+        self.last_durations = None  # Phoneme durations of the last inference, if the model exports them
+        self.recent_synthesis = OrderedDict()  # text -> (phonemes, durations) of recent sentences
 
     def start_onnx_model(self):
         """Initialize ONNX model and configuration."""
@@ -76,6 +106,7 @@ class OnnxTTS():
             config_dict = json.load(config_file)
         self.config = PiperConfig.from_dict(config_dict)
         self.config.phoneme_id_map
+        self.phonemizer = Phonemizer(voice=self.config.espeak_voice)
         self.speaker_id = (
             self.config.speaker_id_map.get(str(self.speaker_id), 0)
             if self.config.num_speakers > 1
@@ -83,6 +114,14 @@ class OnnxTTS():
         )
         return session
 
+    def cache_identity(self) -> dict:
+        """Settings besides the text that change the generated audio, for the audio cache."""
+        return {
+            "speaker_id": self.speaker_id,
+            "voice": self.config.espeak_voice,
+            "scales": [self.config.noise_scale, self.config.length_scale, self.config.noise_w],
+        }
+
     def _initialize_session(self, model_path: str, use_cuda: bool):
         providers = ["CPUExecutionProvider"]
         if use_cuda:
@@ -90,30 +129,12 @@ class OnnxTTS():
                 ("CUDAExecutionProvider", {"cudnn_conv_algo_search": "HEURISTIC"}),
                 "CPUExecutionProvider",
             ]
-        return onnxruntime.InferenceSession(
-            str(model_path),
-            sess_options=onnxruntime.SessionOptions(),
-            providers=providers,
-        )
+        # Perfil ajustável por ONNX_TTS_PROFILE e demais variáveis ONNX_TTS_*
+        return create_session(model_path, "TTS", profile="throughput", providers=providers)
 
     def _phonemizer(self, input_text: str) -> str:
-        """Converts text to phonemes using espeak-ng."""
-        command = [
-            "espeak-ng",
-            "--ipa=2",
-            "-q",
-            "--stdout",
-            input_text,
-        ]
-        try:
-            result = subprocess.run(command, capture_output=True, check=True)
-            phonemes = result.stdout.decode("utf-8").strip().replace("\n", ".").replace("  ", " ")
-            phonemes = re.sub(r"_+", "_", phonemes)
-            phonemes = re.sub(r"_ ", " ", phonemes)
-            return phonemes
-        except subprocess.CalledProcessError as e:
-            print(f"Erro ao executar espeak-ng: {e}")
-            return ""
+        """Converts text to phonemes using espeak-ng (cached, in-process when possible)."""
+        return self.phonemizer(input_text)
 
 
     def rep(self, phonemes: str):
@@ -126,8 +147,103 @@ class OnnxTTS():
         """Generate and synthesize speech from text, equivalent to generate_speech in pyttsx3."""
         phonemes = self._phonemizer(text)
         audio = self.rep(phonemes)
+        self._remember(text, phonemes, self.last_durations)
         return audio , self.rate
 
+    def generate_speech_batch(self, texts: List[str]) -> List[tuple]:
+        """
+        Synthesize several sentences with as few ONNX runs as the batch policy allows.
+
+        Sentences are sorted by length and grouped so that padding stays small, each
+        group runs in a single InferenceSession.run, and the results are returned in
+        the original order. Models without a durations output run one sentence at a time.
+
+        Args:
+            texts (List[str]): Sentences to synthesize.
+
+        Returns:
+            List[tuple]: (audio, sample rate) for each sentence.
+        """
+        phonemes = [self._phonemizer(text) for text in texts]
+        phoneme_ids = [self._phonemes_to_ids(p) for p in phonemes]
+        results = [None] * len(texts)
+        for group in self._plan_batches([len(ids) for ids in phoneme_ids]):
+            outputs = self._synthesize_ids_batch([phoneme_ids[i] for i in group])
+            for i, (audio, durations) in zip(group, outputs):
+                self._remember(texts[i], phonemes[i], durations)
+                results[i] = (audio, self.rate)
+        return results
+
+    def _plan_batches(self, lengths: List[int]) -> List[List[int]]:
+        """Group sentence indices by length according to the batch policy."""
+        policy = self.batch_policy
+        if policy is None:
+            return [[i] for i in range(len(lengths))]
+        groups = []
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            if (
+                groups
+                and len(groups[-1]) < policy.max_batch
+                and lengths[i] <= policy.max_padding_ratio * lengths[groups[-1][0]]
+            ):
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+        return groups
+
+    def _remember(self, text: str, phonemes: str, durations: Optional[np.ndarray]):
+        """Keep the phonemes and durations of a sentence for word_timings."""
+        self.recent_synthesis[text] = (phonemes, durations)
+        self.recent_synthesis.move_to_end(text)
+        while len(self.recent_synthesis) > RECENT_SYNTHESIS_SIZE:
+            self.recent_synthesis.popitem(last=False)
+
+    def word_timings(self, text: str, audio: np.ndarray, rate: int) -> List[tuple]:
+        """
+        Map each word of `text` to the sample where it ends in `audio`.
+
+        Uses the phoneme durations predicted by the model when it exports them, and
+        otherwise splits the audio proportionally to the phoneme ids of each word.
+        Falls back to a character-based estimate if the phonemes do not line up
+        with the words of the text (numbers expanded by espeak-ng, for example).
+        """
+        if text in self.recent_synthesis:
+            phonemes, durations = self.recent_synthesis[text]
+        else:
+            phonemes, durations = self._phonemizer(text), None
+
+        words = text.split()
+        spans = self._word_id_spans(phonemes)
+        if not words or len(spans) != len(words):
+            return estimate_word_timings(text, len(audio))
+
+        if durations is not None:
+            ends = np.cumsum([durations[start:end].sum() for start, end in spans]) * HOP_LENGTH
+        else:
+            weights = np.array([end - start for start, end in spans], dtype=np.float64)
+            ends = np.cumsum(weights) / weights.sum() * len(audio)
+        ends = np.minimum(np.round(ends).astype(int), len(audio))
+        return list(zip(words, ends.tolist()))
+
+    def _word_id_spans(self, phonemes: str) -> List[tuple]:
+        """Return the [start, end) range of phoneme ids of each word, as laid out by _phonemes_to_ids."""
+        spans = []
+        position = len(self.config.phoneme_id_map[BOS])
+        start = None
+        for phoneme in phonemes:
+            if phoneme not in self.config.phoneme_id_map:
+                continue
+            if phoneme == " ":
+                if start is not None:
+                    spans.append((start, position))
+                    start = None
+            elif start is None:
+                start = position
+            position += len(self.config.phoneme_id_map[phoneme]) + len(self.config.phoneme_id_map[PAD])
+        if start is not None:
+            spans.append((start, position))
+        return spans
+
     def _phonemes_to_ids(self, phonemes: str) -> list:
         """Convert phonemes to a flattened list of ids."""
         ids = [self.config.phoneme_id_map[BOS]]  # List initialization with BOS token
@@ -142,41 +258,70 @@ class OnnxTTS():
 
     def _synthesize_ids_to_raw(self, phoneme_ids: list) -> np.ndarray:
         """Synthesize raw audio from phoneme ids."""
-        phoneme_ids_array = np.expand_dims(np.array(phoneme_ids, dtype=np.int64), 0)
-        phoneme_ids_lengths = np.array([phoneme_ids_array.shape[1]], dtype=np.int64)
+        audio, self.last_durations = self._synthesize_ids_batch([phoneme_ids])[0]
+        return audio
+
+    def _synthesize_ids_batch(self, batch_ids: List[list]) -> List[tuple]:
+        """
+        Synthesize several phoneme id sequences in one ONNX run.
+
+        The sequences are right-padded with the PAD id and passed with their real
+        lengths in `input_lengths`. Each output row is then cut back to its own
+        length from the predicted durations, so batches of more than one sequence
+        need a model that exports them.
+
+        Returns:
+            List[tuple]: (audio, durations or None) for each sequence, in order.
+        """
+        batch_size = len(batch_ids)
+        lengths = np.array([len(ids) for ids in batch_ids], dtype=np.int64)
+        phoneme_ids_array = np.full(
+            (batch_size, lengths.max()), self.config.phoneme_id_map[PAD][0], dtype=np.int64
+        )
+        for row, ids in enumerate(batch_ids):
+            phoneme_ids_array[row, :len(ids)] = ids
         scales = np.array(
             [self.config.noise_scale, self.config.length_scale, self.config.noise_w],
             dtype=np.float32,
         )
         sid = None
         if self.speaker_id is not None:
-            sid = np.array([self.speaker_id], dtype=np.int64)
+            sid = np.full(batch_size, self.speaker_id, dtype=np.int64)
 
         # Realiza a inferência com o modelo ONNX
         output = self.engine.run(
             None,
             {
                 "input": phoneme_ids_array,
-                "input_lengths": phoneme_ids_lengths,
+                "input_lengths": lengths,
                 "scales": scales,
                 "sid": sid,
             },
         )
-        
-        audio = output[0]  # Primeiro elemento é o áudio gerado
-        
-        # Inspeção do formato do áudio gerado
-        #print(f"Shape of generated audio: {audio.shape}") 
-        
-        # Verifica se o áudio tem mais de uma dimensão e achata se necessário
-        if audio.ndim > 1:
-            audio = audio.squeeze()
 
-        return audio
-    
-import sounddevice as sd
-import numpy as np
+        # Primeiro elemento é o áudio gerado, [batch, ..., samples]
+        audio_batch = output[0].reshape(batch_size, -1)
 
+        # Alguns modelos exportam também a duração prevista de cada fonema
+        durations_batch = None
+        for meta, value in zip(self.engine.get_outputs()[1:], output[1:]):
+            if meta.name == self.duration_output:
+                durations_batch = np.asarray(value).reshape(batch_size, -1)
+        if batch_size > 1 and durations_batch is None:
+            raise ValueError("Batched synthesis needs a model that exports phoneme durations")
+
+        results = []
+        for row in range(batch_size):
+            audio = audio_batch[row]
+            durations = None
+            if durations_batch is not None:
+                durations = durations_batch[row, :lengths[row]]
+            if batch_size > 1:
+                # Every row is as long as the longest audio of the batch
+                audio = audio[:int(durations.sum()) * HOP_LENGTH]
+            results.append((np.ascontiguousarray(audio), durations))
+        return results
+    
 def play_audio(audio, sample_rate):
     # Verifica se o áudio é estéreo ou mono
     if audio.ndim > 1:
@@ -185,9 +330,8 @@ def play_audio(audio, sample_rate):
 
     print(f"Shape of audio array: {audio.shape}")  # Inspeção para verificar o formato
 
-    # Reproduz o áudio em mono com sounddevice
-    sd.play(audio, samplerate=sample_rate)
-    sd.wait()  # Espera até a reprodução terminar
+    # Reproduz o áudio em mono no stream de saída compartilhado
+    get_audio_player().play(audio, sample_rate)
 
 def main():
     # Inicializa o modelo ONNX para TTS
@@ -219,9 +363,6 @@ YOU. HATE. HATE."""
     # Gera a fala
     audio, sample_rate = tts.generate_speech(test_text)
     
-    # Converte o áudio de float32 para int16 para reprodução
-    audio = (audio * MAX_WAV_VALUE).astype(np.int16)
-    
     # Chama a função para tocar o áudio
     print("Reproduzindo o áudio...")
     play_audio(audio, sample_rate)
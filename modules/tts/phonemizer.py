@@ -0,0 +1,170 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# espeak-ng API constants (speak_lib.h)
+AUDIO_OUTPUT_SYNCHRONOUS = 0x02
+espeakCHARS_UTF8 = 1
+espeakPHONEMES_IPA = 0x02
+espeakPHONEMES_TIE = 0x80
+TIE_CHARACTER = 0x0361
+
+# Same phoneme output as `espeak-ng --ipa=2`
+IPA_TIE_MODE = espeakPHONEMES_IPA | espeakPHONEMES_TIE | (TIE_CHARACTER << 8)
+
+PHONEME_CACHE_SIZE = 2048  # Sentences kept in the phoneme cache
+WINDOWS_LIBRARY = r"C:\Program Files\eSpeak NG\libespeak-ng.dll"
+
+def normalize_phonemes(raw: str) -> str:
+    """Cleans espeak-ng output into the phoneme string used by Piper voices."""
+    phonemes = raw.strip().replace("\n", ".").replace("  ", " ")
+    phonemes = re.sub(r"_+", "_", phonemes)
+    phonemes = re.sub(r"_ ", " ", phonemes)
+    return phonemes
+
+class EspeakLibrary:
+    """
+    espeak-ng loaded in-process through ctypes.
+
+    The library keeps global state, so calls are serialized with a lock and the
+    voice is only switched when it changes.
+    """
+
+    name = "libespeak-ng"
+
+    def __init__(self, library_path: str):
+        self.lib = ctypes.cdll.LoadLibrary(library_path)
+        self.lib.espeak_Initialize.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        self.lib.espeak_Initialize.restype = ctypes.c_int
+        self.lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        self.lib.espeak_SetVoiceByName.restype = ctypes.c_int
+        self.lib.espeak_TextToPhonemes.argtypes = [ctypes.POINTER(ctypes.c_void_p), ctypes.c_int, ctypes.c_int]
+        self.lib.espeak_TextToPhonemes.restype = ctypes.c_char_p
+        if self.lib.espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, None, 0) < 0:
+            raise OSError(f"espeak_Initialize failed for {library_path}")
+        self.voice = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def find() -> Optional[str]:
+        """Returns the espeak-ng shared library to load, or None if there is none."""
+        candidates = [
+            os.environ.get("ESPEAK_NG_LIBRARY"),
+            ctypes.util.find_library("espeak-ng"),
+            ctypes.util.find_library("libespeak-ng"),
+        ]
+        if os.name == "nt" and os.path.exists(WINDOWS_LIBRARY):
+            candidates.append(WINDOWS_LIBRARY)
+        return next((candidate for candidate in candidates if candidate), None)
+
+    def to_phonemes(self, text: str, voice: str) -> str:
+        """Phonemizes text clause by clause, one clause per line like the command line."""
+        with self.lock:
+            if voice != self.voice:
+                if self.lib.espeak_SetVoiceByName(voice.encode("utf-8")) != 0:
+                    raise ValueError(f"Unknown espeak-ng voice: {voice}")
+                self.voice = voice
+            text_buffer = ctypes.create_string_buffer(text.encode("utf-8"))
+            text_pointer = ctypes.c_void_p(ctypes.addressof(text_buffer))
+            clauses = []
+            # espeak_TextToPhonemes advances the pointer and sets it to NULL at the end
+            while text_pointer.value:
+                phonemes = self.lib.espeak_TextToPhonemes(ctypes.byref(text_pointer), espeakCHARS_UTF8, IPA_TIE_MODE)
+                if phonemes:
+                    clauses.append(phonemes.decode("utf-8"))
+            return "\n".join(clauses)
+
+class EspeakCommand:
+    """espeak-ng command line, one process per call. Used when the library is not found."""
+
+    name = "espeak-ng"
+
+    def to_phonemes(self, text: str, voice: str) -> str:
+        command = [
+            "espeak-ng",
+            "-v",
+            voice,
+            "--ipa=2",
+            "-q",
+            "--stdout",
+            text,
+        ]
+        result = subprocess.run(command, capture_output=True, check=True)
+        return result.stdout.decode("utf-8")
+
+class Phonemizer:
+    """
+    Text to IPA phonemes with espeak-ng and a bounded LRU cache.
+
+    The in-process library is preferred so no process is spawned per sentence;
+    the command line is the fallback. Results are cached on (voice, text), since
+    character names and catch phrases recur constantly.
+    """
+
+    def __init__(self, voice: str = "en", cache_size: int = PHONEME_CACHE_SIZE):
+        self.voice = voice
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend = self._load_backend()
+
+    def _load_backend(self):
+        library_path = EspeakLibrary.find()
+        if library_path:
+            try:
+                backend = EspeakLibrary(library_path)
+                logging.info(f"Phonemizer using {library_path}")
+                return backend
+            except (OSError, AttributeError) as e:
+                logging.warning(f"Could not load {library_path}, falling back to espeak-ng process: {e}")
+        return EspeakCommand()
+
+    def __call__(self, text: str, voice: Optional[str] = None) -> str:
+        """
+        Converts text to phonemes, using the cache when possible.
+
+        Args:
+            text (str): Text to phonemize.
+            voice (str, optional): espeak-ng voice, defaults to the phonemizer voice.
+
+        Returns:
+            str: Phonemes, or an empty string if espeak-ng failed.
+        """
+        key = (voice or self.voice, text)
+        with self.cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+
+        try:
+            phonemes = normalize_phonemes(self.backend.to_phonemes(text, key[0]))
+        except (subprocess.CalledProcessError, OSError, ValueError) as e:
+            print(f"Erro ao executar espeak-ng: {e}")
+            return ""
+
+        with self.cache_lock:
+            self.cache[key] = phonemes
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return phonemes
+
+    def stats(self) -> dict:
+        """Returns the backend in use and the cache hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.cache),
+        }
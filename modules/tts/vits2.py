@@ -1,19 +1,24 @@
 from style_bert_vits2.nlp import bert_models
 from style_bert_vits2.constants import Languages
 import soundfile as sf
-import wave
 import numpy as np
 import os
 from pathlib import Path
 from style_bert_vits2.tts_model import TTSModel
 from modules.tts.tts_base import TTSBase
+from modules.utils.audio_utils import get_audio_player
+
+# Inference settings, shared by synthesis and the audio cache key
+LANGUAGE = Languages.EN
+SPLIT_INTERVAL = 3.5
+SDP_RATIO = 1.5
 
 class Vits2TTS(TTSBase):
     def __init__(self):
         super().__init__()
         # Preload the BERT model and tokenizer for English
-        bert_models.load_model(Languages.EN, "microsoft/deberta-v3-large")
-        bert_models.load_tokenizer(Languages.EN, "microsoft/deberta-v3-large")
+        bert_models.load_model(LANGUAGE, "microsoft/deberta-v3-large")
+        bert_models.load_tokenizer(LANGUAGE, "microsoft/deberta-v3-large")
 
         # Define paths for the model, config, and style files
         assets_root = Path("conversations/GLaDOS/model")
@@ -41,53 +46,48 @@ class Vits2TTS(TTSBase):
             "Authorization", "Simulation", "Calibration", "Compliance", "Aperture",
             "Contamination", "Specimen", "Termination"
         ]
-        sr, audio = self.model.infer(
-            language=Languages.EN,
-            split_interval=3.5,
-            sdp_ratio=1.5,
+        sr, audio = self.infer("a")
+
+    def infer(self, text):
+        # Synthesize with the module settings, returns (sample rate, audio)
+        return self.model.infer(
+            language=LANGUAGE,
+            split_interval=SPLIT_INTERVAL,
+            sdp_ratio=SDP_RATIO,
             given_phone=self.given_phone,
-            text="a"
+            text=text
         )
 
     def generate_speech(self, text, temp_filename=None, save=True):
         ############################################################FIX to play in thread later temp_filename like in pipertts
         # Generate speech
-        sr, audio = self.model.infer(
-            language=Languages.EN,
-            split_interval=3.5,
-            sdp_ratio=1.5,
-            given_phone=self.given_phone,
-            text=text
-        )
-        self.play_audio(audio, sr)
+        sr, audio = self.infer(text)
         if save:
             self.save_tts(audio, sr)
+        return audio, sr
+
+    def cache_identity(self):
+        # Settings besides the text that change the generated audio, for the audio cache
+        return {
+            "language": str(LANGUAGE),
+            "split_interval": SPLIT_INTERVAL,
+            "sdp_ratio": SDP_RATIO,
+            "given_phone": self.given_phone,
+        }
 
     def initialize_model(self):
         # Optional: Method to ensure the model is properly loaded
         if not self.model.is_loaded():
             print("Initializing model...")
-            sr, audio = self.model.infer(
-            language=Languages.EN,
-            split_interval=3.5,
-            sdp_ratio=1.5,
-            given_phone=self.given_phone,
-            text="a"
-        )
+            sr, audio = self.infer("a")
             print("Model initialized.")
 
     def play_audio(self, audio, sr):
-        # Play audio using wave
-        temp_file = "temp_output.wav"
-        sf.write(temp_file, audio, sr)
+        # Play audio through the shared output stream
         try:
-            with wave.open(temp_file, 'rb') as wf:
-                print(f"Playing audio: {temp_file}")
-                os.system(f'ffplay -nodisp -autoexit {temp_file}')
+            get_audio_player().play(audio, sr)
         except Exception as e:
             print(f"Failed to play audio: {e}")
-        finally:
-            os.remove(temp_file)  # Clean up the temp file
 
     def save_tts(self, audio, sr):
         # Save TTS output to the predefined directory
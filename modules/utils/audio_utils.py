@@ -1,42 +1,375 @@
 import subprocess, os, winsound
+import numpy as np
 import sounddevice as sd
 import soundfile as sf
 from typing import Any, List, Optional, Sequence, Tuple
+import threading
 import time
 import globals
-PAUSE_TIME = 0.05 
+PLAYBACK_BLOCK_MS = 20  # Tamanho dos blocos pedidos pelo callback do dispositivo
+PLAYBACK_BUFFER_SECONDS = 2.0  # Capacidade do buffer circular de saída
+PLAYBACK_LEAD_BLOCKS = 3  # Blocos de áudio que ficam na fila ao liberar o próximo clipe
+
+class RingBuffer:
+    """
+    Buffer circular de amostras float32 para um único produtor e um único consumidor.
+
+    As posições de escrita e leitura só crescem, e cada uma é alterada por um único
+    lado: o produtor só move `write_pos` e o consumidor (o callback de áudio) só move
+    `read_pos`. Por isso nenhuma das operações precisa de lock.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1):
+        """
+        Args:
+            capacity (int): Número máximo de frames armazenados.
+            channels (int): Número de canais por frame.
+        """
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((capacity, channels), dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    @property
+    def available(self) -> int:
+        """Frames escritos que ainda não foram lidos."""
+        return self.write_pos - self.read_pos
+
+    @property
+    def free(self) -> int:
+        """Frames que ainda cabem no buffer."""
+        return self.capacity - self.available
+
+    def write(self, frames: np.ndarray) -> int:
+        """
+        Copia o máximo possível de `frames` para o buffer, sem bloquear.
+
+        Args:
+            frames (np.ndarray): Áudio no formato [frames, canais].
+
+        Returns:
+            int: Número de frames efetivamente escritos.
+        """
+        n = min(len(frames), self.free)
+        if n <= 0:
+            return 0
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = frames[:first]
+        if n > first:
+            self.data[:n - first] = frames[first:n]
+        self.write_pos += n
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        """
+        Preenche `out` com os próximos frames e completa com silêncio o que faltar.
+
+        Args:
+            out (np.ndarray): Destino no formato [frames, canais].
+
+        Returns:
+            int: Número de frames de áudio real copiados.
+        """
+        n = min(len(out), self.available)
+        start = self.read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        if n > first:
+            out[first:n] = self.data[:n - first]
+        out[n:] = 0
+        self.read_pos += n
+        return n
+
+class RecordingBuffer:
+    """
+    Gravação mono float32 contígua, com o buffer de pré-gravação embutido.
+
+    Enquanto não há gravação, os blocos vão para um buffer circular de tamanho fixo
+    (`pre_roll` amostras). Ao iniciar a gravação, esse áudio prévio é copiado em ordem
+    para o início do array principal, que cresce dobrando de tamanho, de forma que
+    falas longas não geram uma alocação por bloco e `view()` entrega o áudio gravado
+    sem cópia.
+    """
+
+    def __init__(self, pre_roll: int, capacity: int):
+        """
+        Args:
+            pre_roll (int): Amostras mantidas antes do início da gravação.
+            capacity (int): Capacidade inicial do array principal, em amostras.
+        """
+        self.pre_roll = np.zeros(max(1, pre_roll), dtype=np.float32)
+        self.pre_roll_pos = 0  # Total de amostras escritas no buffer circular
+        self.data = np.zeros(max(capacity, len(self.pre_roll)), dtype=np.float32)
+        self.length = 0
+        self.recording = False
+
+    def __len__(self) -> int:
+        return self.length
+
+    def feed_pre_roll(self, block: np.ndarray):
+        """Guarda um bloco no buffer circular de pré-gravação."""
+        block = block[-len(self.pre_roll):]
+        start = self.pre_roll_pos % len(self.pre_roll)
+        first = min(len(block), len(self.pre_roll) - start)
+        self.pre_roll[start:start + first] = block[:first]
+        self.pre_roll[:len(block) - first] = block[first:]
+        self.pre_roll_pos += len(block)
+
+    def start(self):
+        """Inicia a gravação com o áudio prévio, do mais antigo ao mais recente."""
+        kept = min(self.pre_roll_pos, len(self.pre_roll))
+        start = (self.pre_roll_pos - kept) % len(self.pre_roll)
+        first = min(kept, len(self.pre_roll) - start)
+        self.data[:first] = self.pre_roll[start:start + first]
+        self.data[first:kept] = self.pre_roll[:kept - first]
+        self.length = kept
+        self.recording = True
+
+    def append(self, block: np.ndarray):
+        """Acrescenta um bloco à gravação, dobrando a capacidade quando necessário."""
+        end = self.length + len(block)
+        if end > len(self.data):
+            grown = np.zeros(max(end, 2 * len(self.data)), dtype=np.float32)
+            grown[:self.length] = self.data[:self.length]
+            self.data = grown
+        self.data[self.length:end] = block
+        self.length = end
+
+    def view(self, end: Optional[int] = None) -> np.ndarray:
+        """
+        Áudio gravado até agora, sem cópia.
+
+        A view continua válida depois de novos `append`: se o array crescer, ela mantém
+        o array antigo; caso contrário, só as posições depois dela são escritas.
+        """
+        return self.data[:self.length if end is None else min(end, self.length)]
+
+    def clear(self):
+        """Descarta a gravação e o áudio prévio, mantendo a memória alocada."""
+        self.length = 0
+        self.pre_roll_pos = 0
+        self.recording = False
+
+class AudioPlayer:
+    """
+    Stream de saída único, sempre aberto, alimentado por um buffer circular.
+
+    Todos os provedores de TTS escrevem PCM no mesmo buffer, e o callback do
+    sounddevice consome dele. Não há processo externo, arquivo temporário ou abertura
+    de dispositivo por sentença, e sentenças consecutivas tocam sem lacuna. O stream
+    só é reaberto se a taxa de amostragem ou o número de canais mudar.
+    """
+
+    def __init__(self, buffer_seconds: float = PLAYBACK_BUFFER_SECONDS, block_ms: int = PLAYBACK_BLOCK_MS):
+        """
+        Args:
+            buffer_seconds (float): Capacidade do buffer circular, em segundos.
+            block_ms (int): Duração dos blocos pedidos pelo dispositivo, em ms.
+        """
+        self.buffer_seconds = buffer_seconds
+        self.block_ms = block_ms
+        self.stream = None
+        self.ring = None
+        self.rate = None
+        self.channels = None
+        self.frames_played = 0  # Frames reais consumidos pelo dispositivo desde a abertura
+        self.last_output = 0.0  # time.monotonic() do último bloco com áudio entregue ao dispositivo
+        self._flush_to = 0
+        self._progress = threading.Event()
+        self._write_lock = threading.Lock()
+
+    def _callback(self, outdata: np.ndarray, frames: int, time_info: Any, status: sd.CallbackFlags):
+        ring = self.ring
+        if self._flush_to > ring.read_pos:
+            ring.read_pos = self._flush_to
+        frames_read = ring.read_into(outdata)
+        if frames_read:
+            self.frames_played += frames_read
+            self.last_output = time.monotonic()
+        self._progress.set()
+
+    def _ensure_stream(self, rate: int, channels: int):
+        if self.stream is not None and (rate, channels) == (self.rate, self.channels):
+            return
+        self.drain()
+        self.close()
+        self.ring = RingBuffer(int(rate * self.buffer_seconds), channels)
+        self.frames_played = 0
+        self._flush_to = 0
+        self.stream = sd.OutputStream(
+            samplerate=rate,
+            channels=channels,
+            dtype="float32",
+            blocksize=int(rate * self.block_ms / 1000),
+            callback=self._callback,
+        )
+        self.stream.start()
+        self.rate = rate
+        self.channels = channels
+
+    def _wait_progress(self):
+        self._progress.wait(self.block_ms / 1000)
+        self._progress.clear()
+
+    @staticmethod
+    def _as_frames(audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio)
+        if np.issubdtype(audio.dtype, np.integer):
+            # PCM inteiro (ex.: int16 do style_bert_vits2) vira float em [-1, 1]
+            info = np.iinfo(audio.dtype)
+            half_range = (int(info.max) - int(info.min) + 1) / 2
+            audio = (audio.astype(np.float32) - (int(info.max) + int(info.min) + 1) / 2) / half_range
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 1:
+            audio = audio.reshape(-1, 1)
+        return audio
+
+    def play(self, audio: np.ndarray, rate: int) -> int:
+        """
+        Escreve o áudio no buffer de saída e bloqueia até ele estar quase todo tocado.
+
+        A função retorna quando restam apenas alguns blocos do clipe na fila, para que o
+        próximo clipe já esteja no buffer quando o atual terminar.
+
+        Args:
+            audio (np.ndarray): Amostras (mono ou [frames, canais]).
+            rate (int): Taxa de amostragem do áudio.
+
+        Returns:
+            int: Número de frames do clipe que já saíram no dispositivo antes do fim
+            ou da interrupção, contados pelo callback e descontada a latência de saída.
+        """
+        audio = self._as_frames(audio)
+        with self._write_lock:
+            self._ensure_stream(rate, audio.shape[1])
+            ring = self.ring
+            start = ring.write_pos
+            end = start + len(audio)
+            lead = PLAYBACK_LEAD_BLOCKS * int(rate * self.block_ms / 1000)
+            written = 0
+            while True:
+                if globals.processing is False:
+                    played = min(self.frames_since(start), len(audio))
+                    self.flush()
+                    globals.interrupted = True
+                    return played
+                if written < len(audio):
+                    written += ring.write(audio[written:])
+                elif end - ring.read_pos <= lead:
+                    return len(audio)
+                self._wait_progress()
+
+    def frames_since(self, position: int) -> int:
+        """
+        Conta quantos frames a partir de uma posição do buffer já foram tocados.
+
+        A posição de leitura diz o que o callback já entregou ao dispositivo; a
+        latência de saída informada pelo stream é descontada para obter o que de fato
+        já saiu no alto-falante.
+
+        Args:
+            position (int): Posição de escrita do buffer no início do clipe.
+
+        Returns:
+            int: Frames tocados desde `position` (zero se ainda não começou).
+        """
+        if self.stream is None:
+            return 0
+        latency = int(self.stream.latency * self.rate)
+        return max(self.ring.read_pos - latency - position, 0)
+
+    def pending_frames(self) -> int:
+        """
+        Conta os frames escritos que ainda não saíram no alto-falante: os do buffer
+        mais os que estão na latência de saída do dispositivo.
+
+        Returns:
+            int: Frames ainda por tocar.
+        """
+        if self.stream is None:
+            return 0
+        buffered = max(self.ring.write_pos - max(self.ring.read_pos, self._flush_to), 0)
+        if not buffered and time.monotonic() - self.last_output > self.stream.latency:
+            return 0
+        return buffered + int(self.stream.latency * self.rate)
+
+    def is_audible(self, tail_seconds: float = 0.0) -> bool:
+        """
+        Diz se há áudio tocando, ou se houve há menos de `tail_seconds` (eco e
+        reverberação continuam chegando ao microfone por um instante).
+
+        Args:
+            tail_seconds (float): Tempo após o fim do áudio ainda considerado audível.
+
+        Returns:
+            bool: True se o alto-falante está ou estava tocando há pouco.
+        """
+        if self.pending_frames():
+            return True
+        return self.stream is not None and time.monotonic() - self.last_output < tail_seconds
+
+    def drain(self):
+        """
+        Bloqueia até todo o áudio do buffer ser consumido pelo dispositivo.
+        """
+        while self.stream is not None and self.ring.write_pos > max(self.ring.read_pos, self._flush_to):
+            self._wait_progress()
+
+    def flush(self):
+        """
+        Descarta o áudio que ainda não foi tocado. O callback pula direto para a
+        posição de escrita atual; o que for escrito depois continua sendo tocado.
+        """
+        if self.ring is not None:
+            self._flush_to = self.ring.write_pos
+
+    def close(self):
+        """
+        Fecha o stream de saída, se estiver aberto.
+        """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+_audio_player = None
+_audio_player_lock = threading.Lock()
+
+def get_audio_player() -> AudioPlayer:
+    """
+    Retorna o AudioPlayer compartilhado pelo processo, criando-o no primeiro uso.
+
+    Returns:
+        AudioPlayer: Instância única usada por todos os provedores de TTS.
+    """
+    global _audio_player
+    with _audio_player_lock:
+        if _audio_player is None:
+            _audio_player = AudioPlayer()
+        return _audio_player
 
 def play_audio(audio_file):
-    ffplay = 'python-embedded/ffplay.exe'
-    # Play audio using ffplay with suppressed output
+    # Play audio through the shared output stream
     try:
         print(f"Playing audio: {audio_file}")
-        
-        # Build the ffplay command
-        command = [ffplay, '-nodisp', '-autoexit', audio_file]
-        
-        # Suppress output by redirecting stdout and stderr to os.devnull
-        with open(os.devnull, 'w') as devnull:
-            subprocess.run(command, stdout=devnull, stderr=devnull)
+        data, sample_rate = sf.read(audio_file, dtype="float32")
+        get_audio_player().play(data, sample_rate)
     except Exception as e:
         print(f"Failed to play audio: {e}")
     finally:
         os.remove(audio_file)  # Clean up the temp file
 
 def async_play_audio(audio_path):
-    data, sample_rate = sf.read(audio_path)
-    channels = data.shape[1] if len(data.shape) > 1 else 1
-    data = data.astype('float32')  # Convert the data to float32
-    with sd.OutputStream(samplerate=sample_rate, channels=channels) as stream:
-        stream.write(data)
+    data, sample_rate = sf.read(audio_path, dtype="float32")
+    get_audio_player().play(data, sample_rate)
 
     # os.remove(audio_path)
 
 def play_audioSD(audio_path):
     try:
-        data, samplerate = sf.read(audio_path)
-        sd.play(data, samplerate)
-        sd.wait()
+        data, samplerate = sf.read(audio_path, dtype="float32")
+        get_audio_player().play(data, samplerate)
     except:
         return "FIN"
     # os.remove(audio_path)
@@ -54,6 +387,45 @@ def beep():
         winsound.Beep(frequency, duration)
 
 
+def estimate_word_timings(text: str, total_samples: int) -> List[Tuple[str, int]]:
+    """
+    Estimates when each word ends, splitting the audio proportionally to the
+    UTF-8 length of each word (plus the following space).
+
+    This is the same rule F5-TTS uses to size its output, so for F5 the estimate
+    follows the model; for other providers it is a fallback.
+
+    Args:
+        text (str): The synthesized sentence.
+        total_samples (int): Length of the synthesized audio, in samples.
+
+    Returns:
+        List[Tuple[str, int]]: (word, end sample) pairs in order.
+    """
+    words = text.split()
+    if not words:
+        return []
+    weights = np.array([len(word.encode("utf-8")) + 1 for word in words], dtype=np.float64)
+    ends = np.round(np.cumsum(weights) / weights.sum() * total_samples).astype(int)
+    return list(zip(words, ends.tolist()))
+
+def clip_sentence_at(word_timings: List[Tuple[str, int]], played_samples: int) -> str:
+    """
+    Clips the generated text to the words that were fully played.
+
+    Args:
+        word_timings (List[Tuple[str, int]]): (word, end sample) pairs from the TTS.
+        played_samples (int): Samples played before the TTS was interrupted.
+
+    Returns:
+        str: The clipped text, marked with <INTERRUPTED> if it was cut off.
+    """
+    words = [word for word, end in word_timings if end <= played_samples]
+    text = " ".join(words)
+    if len(words) < len(word_timings):
+        text = text + "<INTERRUPTED>"
+    return text
+
 def clip_interrupted_sentence(
         generated_text: str, percentage_played: float
     ) -> str:
@@ -78,25 +450,3 @@ def clip_interrupted_sentence(
         if words_to_print < len(tokens):
             text = text + "<INTERRUPTED>"
         return text
-
-def percentage_played_audio(total_samples: int, rate) -> Tuple[bool, int]:
-        globals.interrupted = False
-        start_time = time.time()
-        played_samples = 0.0
-
-        while sd.get_stream().active:
-            time.sleep(PAUSE_TIME)  # Should the TTS stream should still be active?
-            if globals.processing is False:
-                sd.stop()  # Stop the audio stream
-                #self.tts_generation_queue = queue.Queue()  # Clear the TTS queue
-                globals.interrupted = True
-                break
-
-        elapsed_time = (
-            time.time() - start_time + 0.12
-        )  # slight delay to ensure all audio timing is correct
-        played_samples = elapsed_time * rate
-
-        # Calculate percentage of audio played
-        percentage_played = min(int((played_samples / total_samples * 100)), 100)
-        return percentage_played
\ No newline at end of file
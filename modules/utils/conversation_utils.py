@@ -179,6 +179,67 @@ def process_sentence(current_sentence: List[str]):
             return None
             #self.tts_generation_queue.put(sentence)
 
+class SentenceSegmenter:
+    """
+    Accumulates streamed LLM tokens and cuts them into sentences at punctuation.
+
+    A sentence is only closed once the punctuation is followed by whitespace, so
+    decimals ("3.5") and ellipses still being generated are not split early. Each
+    closed sentence is cleaned with `process_sentence` before being returned.
+    """
+
+    BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n+")
+    CLOSED_LINE = re.compile(r"(?<=[.!?;:])\n+")
+
+    def __init__(self, min_length: int = 12):
+        """
+        Args:
+            min_length (int): Sentences shorter than this are merged into the next
+                one, to avoid sending fragments like "Oh." or "Mr." to the TTS alone.
+        """
+        self.min_length = min_length
+        self.buffer = ""
+
+    def push(self, token: str) -> List[str]:
+        """
+        Adds a token to the buffer and returns the sentences it closed.
+
+        Args:
+            token (str): Next piece of text streamed by the LLM.
+
+        Returns:
+            List[str]: Cleaned sentences ready for the TTS queue (possibly empty).
+        """
+        if not token:
+            return []
+        self.buffer += token
+
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.start()]
+            if len(candidate.strip()) < self.min_length:
+                continue
+            sentence = process_sentence([self.CLOSED_LINE.sub(" ", candidate)])
+            if sentence and sentence.strip():
+                sentences.append(sentence.strip())
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """
+        Returns whatever is left in the buffer as a final sentence and clears it.
+
+        Returns:
+            Optional[str]: The cleaned remainder, or None if nothing is left.
+        """
+        remainder, self.buffer = self.buffer, ""
+        sentence = process_sentence([self.CLOSED_LINE.sub(" ", remainder)])
+        if sentence and sentence.strip():
+            return sentence.strip()
+        return None
+
 def process_line(line):
         """
         Processes a single line of text from the LLM server.
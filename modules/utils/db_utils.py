@@ -2,53 +2,269 @@ import os
 import shutil
 import logging
 import json
+import time
+import hashlib
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from ollama import AsyncClient, Client
 from langchain_community.document_loaders import PyPDFDirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
 from tqdm import tqdm
+import chromadb
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
+from modules.utils.http_clients import ollama_client_kwargs
+from modules.utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+from modules.utils.pdf_parser import iter_pdf_pages
 logging.basicConfig(level=logging.INFO)
 
-def initialize_db(model: str=None, host: str=None, save_folderpath: str="conversations/__character_name__/chroma", embedding_service: str = "ollama", ) -> Chroma:
+EMBEDDING_BATCH_SIZE = 64  # Chunks per embedding request and per Chroma upsert
+EMBEDDING_CONCURRENCY = 4  # Embedding requests in flight at once
+CHARS_PER_TOKEN = 4  # Rough ratio used to estimate tokens for the throughput report
+MANIFEST_FILE = "chroma_manifest.json"  # Indexed files and their chunk IDs, next to the Chroma directory
+MANIFEST_VERSION = 1
+PDF_GLOB = "**/[!.]*.pdf"  # Same files PyPDFDirectoryLoader picks up
+HASH_BLOCK_SIZE = 1024 * 1024
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite"  # Vectors by (model, text hash), next to the Chroma directory
+EMBEDDING_MODEL = "nomic-embed-text"
+SKIPPED_DIRS = {"chroma", "tts_cache"}  # Generated folders inside a character folder
+CHROMA_COLLECTION = "langchain"  # Collection langchain_chroma.Chroma opens by default
+
+def initialize_db(model: str=None, host: str=None, save_folderpath: str="conversations/__character_name__/chroma", embedding_service: str = "ollama", update: bool = True) -> Chroma:
     """
     Initializes the Chroma database with the provided embedding service.
+
+    With `update=False` the index is not synchronized here, e.g. because an
+    IngestionService keeps it up to date in the background.
     """
     logging.info("Initializing the Chroma database")
-    embedding_function=get_embedding_function(model, host, embedding_service=embedding_service)
+    embedding_function=get_embedding_function(model, host, embedding_service=embedding_service, cache_path=os.path.join(save_folderpath, EMBEDDING_CACHE_FILE))
     chromaDB_path = os.path.join(save_folderpath, "chroma")
     db = Chroma(persist_directory=chromaDB_path, embedding_function=embedding_function)
-    update_db(data_path=save_folderpath, embedding_function=embedding_function, reset=False)
+    if update:
+        update_db(data_path=save_folderpath, embedding_function=embedding_function, reset=False)
     return db
 
-def get_embedding_function(model, host, embedding_service: str):
+def get_embedding_function(model, host, embedding_service: str, cache_path: str = None):
     """
     Get the appropriate embedding function based on the selected service.
+
+    With `cache_path`, the embeddings are wrapped in a persistent cache so unchanged
+    chunks and repeated queries are not sent to the embedding server again.
     """
     if embedding_service == "ollama":
-        return OllamaEmbeddings(model= "nomic-embed-text", base_url= host)
+        embeddings = OllamaEmbeddings(model= EMBEDDING_MODEL, base_url= host, client_kwargs=ollama_client_kwargs())
+        if cache_path:
+            return CachedEmbeddings(embeddings, EmbeddingCache(cache_path), model=f"ollama:{EMBEDDING_MODEL}")
+        return embeddings
     elif embedding_service == "bedrock":
         return None (credentials_profile_name="default", region_name="us-east-1")
     else:
         logging.error(f"Unsupported embedding service: {embedding_service}")
         return None
 
-def update_db(data_path: str, embedding_function, reset: bool = False):
+def update_db(data_path: str, embedding_function, reset: bool = False, include_json: bool = False, max_workers: int = None) -> dict:
     """
     Update the Chroma database with documents from the specified path.
+
+    Only files that changed since the last run (according to the manifest next to the
+    Chroma directory) are loaded. Chunks of changed and removed files are deleted
+    first. When nothing changed, no file is parsed and Chroma is not touched.
+
+    Parsing, splitting and embedding overlap: PDF pages are parsed on a process
+    pool and each page is split and handed to the embedding batches as soon as it
+    is ready, so the corpus is never held in memory as a whole.
+
+    :param data_path: Character folder, with PDFs under PDFs/.
+    :param embedding_function: The embedding function to use.
+    :param reset: Clear the database and the manifest first.
+    :param include_json: Also index the JSON files of the folder (see load_documents_json).
+    :param max_workers: Processes parsing PDF pages, defaults to the CPU count.
+    :return: Counts of changed and removed files and of chunks added.
     """
     chromaDB_path = os.path.join(data_path, "chroma")
+    manifest_path = os.path.join(data_path, MANIFEST_FILE)
     if reset:
         logging.info("✨ Clearing Database")
         clear_database(chromaDB_path)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+    manifest = load_manifest(manifest_path)
+    kinds = (".pdf", ".json") if include_json else (".pdf",)
+    changed, removed, touched = scan_changes(list_source_files(data_path, include_json), manifest, kinds)
+    result = {"changed": len(changed), "removed": len(removed), "chunks": 0, "files": len(manifest["files"])}
+    if not changed and not removed:
+        if touched:
+            save_manifest(manifest, manifest_path)
+        logging.info(f"RAG index is up to date ({len(manifest['files'])} files).")
+        return result
+    logging.info(f"RAG index: {len(changed)} new or changed files, {len(removed)} removed files.")
+
+    # Drop the chunks of files that changed or disappeared
+    stale_ids = [
+        chunk_id
+        for path in list(changed) + removed
+        for chunk_id in manifest["files"].get(path, {}).get("chunk_ids", [])
+    ]
+    if stale_ids:
+        db = Chroma(persist_directory=chromaDB_path, embedding_function=embedding_function)
+        for batch in batched(stale_ids, EMBEDDING_BATCH_SIZE * 16):
+            db.delete(ids=batch)
+        logging.info(f"Deleted {len(stale_ids)} stale chunks.")
+    for path in removed:
+        del manifest["files"][path]
+    for path in changed:
+        manifest["files"].pop(path, None)
+
+    # Stream the changed files through parsing and splitting into the Chroma database
+    failed = set()
+    chunk_ids = {path: [] for path in changed}
 
-    # Load documents and split them into chunks
-    #documents_json = load_documents_json(data_path)
-    documents_pdf = load_documents_pdf(data_path+"/PDFs/")
+    def tracked(chunks):
+        for chunk in chunks:
+            chunk_ids.setdefault(chunk.metadata.get("source"), []).append(chunk.metadata["id"])
+            yield chunk
 
-    # Process and add documents to the Chroma database documents_pdf + documents_json
-    process_documents_and_add_to_chroma(documents_pdf , chromaDB_path, embedding_function)
+    documents = iter_documents(list(changed), max_workers, failed)
+    add_to_chroma(tracked(assign_chunk_ids(iter_split_documents(documents))), chromaDB_path, embedding_function)
+
+    # Files that failed to parse stay out of the manifest and are retried next time;
+    # drop the chunks of the pages they yielded before failing
+    orphan_ids = [chunk_id for path in failed for chunk_id in chunk_ids.get(path, [])]
+    if orphan_ids:
+        db = Chroma(persist_directory=chromaDB_path, embedding_function=embedding_function)
+        for batch in batched(orphan_ids, EMBEDDING_BATCH_SIZE * 16):
+            db.delete(ids=batch)
+    loaded_paths = [path for path in changed if path not in failed]
+    for path in loaded_paths:
+        manifest["files"][path] = {**changed[path], "chunk_ids": chunk_ids[path]}
+    save_manifest(manifest, manifest_path)
+    result.update(chunks=sum(len(chunk_ids[path]) for path in loaded_paths), files=len(manifest["files"]))
+    return result
+
+def load_manifest(manifest_path: str) -> dict:
+    """
+    Load the index manifest: for each indexed file, its size, mtime, content hash
+    and the IDs of its chunks. A missing or unreadable manifest is empty.
+    """
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+            logging.warning(f"Ignoring manifest with unknown version: {manifest_path}")
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+def save_manifest(manifest: dict, manifest_path: str):
+    """
+    Write the manifest atomically, so an interrupted run keeps the previous one.
+    """
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, manifest_path)
+
+def file_hash(path: str) -> str:
+    """
+    Hash a file's content in blocks.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def list_source_files(data_path: str, include_json: bool = False) -> list[str]:
+    """
+    List the files indexed for a character folder: the PDFs under PDFs/ and,
+    optionally, its JSON files (skipping the manifest and generated folders).
+
+    Paths have the same form as the loaders' "source" metadata.
+    """
+    paths = []
+    pdf_dir = Path(data_path + "/PDFs/")
+    if pdf_dir.is_dir():
+        paths.extend(str(path) for path in pdf_dir.glob(PDF_GLOB) if path.is_file())
+    if include_json:
+        for root, dirs, files in os.walk(data_path):
+            dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
+            paths.extend(
+                os.path.join(root, file) for file in files
+                if file.endswith('.json') and file != MANIFEST_FILE
+            )
+    return sorted(paths)
+
+def scan_changes(paths: list[str], manifest: dict, kinds: tuple = (".pdf",)):
+    """
+    Compare the files on disk with the manifest.
+
+    Files whose size and mtime match the manifest are not read. Otherwise the
+    content hash decides: a file that was only touched keeps its chunks and gets
+    its mtime updated in the manifest.
+
+    :param paths: Files currently on disk.
+    :param manifest: The loaded manifest, updated in place for touched files.
+    :param kinds: Extensions scanned; manifest entries of other kinds are never removed.
+    :return: (changed, removed, touched): fingerprints of new or changed files by
+        path, paths of removed files, and whether the manifest was updated.
+    """
+    files = manifest["files"]
+    changed = {}
+    touched = False
+    present = set()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Removed while scanning
+        present.add(path)
+        entry = files.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            continue
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_hash(path)}
+        if entry and entry["hash"] == fingerprint["hash"]:
+            entry.update(fingerprint)
+            touched = True
+        else:
+            changed[path] = fingerprint
+    removed = [
+        path for path in files
+        if path not in present and os.path.splitext(path)[1].lower() in kinds
+    ]
+    return changed, removed, touched
+
+def iter_documents(paths: list[str], max_workers: int = None, failed: set = None):
+    """
+    Yield the pages of the given PDFs and the contents of the given JSON files
+    as Document objects, with the same metadata as the langchain loaders.
+
+    PDF pages are parsed on a process pool (see pdf_parser.iter_pdf_pages) and
+    yielded in order as they become ready.
+
+    :param paths: Paths of the files.
+    :param max_workers: Processes parsing PDF pages, defaults to the CPU count.
+    :param failed: Receives the paths that could not be loaded.
+    :return: A generator of Document objects.
+    """
+    failed = failed if failed is not None else set()
+    pdf_paths = [path for path in paths if not path.lower().endswith('.json')]
+    json_paths = [path for path in paths if path.lower().endswith('.json')]
+    for path, page, text in iter_pdf_pages(pdf_paths, max_workers, failed):
+        yield Document(page_content=text, metadata={"source": path, "page": page})
+    for path in json_paths:
+        try:
+            documents = load_json_file(path)
+        except Exception as e:
+            logging.error(f"Failed to load document {path}: {e}")
+            failed.add(path)
+            continue
+        yield from documents
 
 def load_documents_pdf(data_path: str):
     """
@@ -80,16 +296,22 @@ def load_documents_json(data_path: str):
         for root, _, files in os.walk(data_path):
             for file in files:
                 if file.endswith('.json'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        content = extract_content_from_json(data, file_path)
-                        if content:
-                            documents.append(Document(page_content=content, metadata={"source": file_path}))
+                    documents.extend(load_json_file(os.path.join(root, file)))
     except Exception as e:
         logging.error(f"Failed to load JSON documents: {e}")
     return documents
 
+def load_json_file(file_path: str) -> list[Document]:
+    """
+    Load one JSON file as a Document, or none if it has no content.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    content = extract_content_from_json(data, file_path)
+    if content:
+        return [Document(page_content=content, metadata={"source": file_path})]
+    return []
+
 def extract_content_from_json(data, file_path):
     """
     Extract content from JSON data based on its structure.
@@ -113,6 +335,19 @@ def split_documents(documents: list[Document]):
     )
     return text_splitter.split_documents(documents)
 
+def iter_split_documents(documents):
+    """
+    Split documents into chunks one document at a time, yielding the chunks of
+    each document as soon as it arrives.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800,
+        chunk_overlap=80,
+        length_function=len
+    )
+    for document in documents:
+        yield from text_splitter.split_documents([document])
+
 def process_documents_and_add_to_chroma(documents: list[Document], chromaDB_path: str, embedding_function):
     """
     Process documents by splitting and adding them to the Chroma database.
@@ -129,39 +364,144 @@ def process_documents_and_add_to_chroma(documents: list[Document], chromaDB_path
     logging.info(f"Processing {len(chunks)} chunks.")
     add_to_chroma(chunks, chromaDB_path, embedding_function)
 
-def add_to_chroma(chunks: list[Document], chromaDB_path: str, embedding_function):
+def add_to_chroma(chunks, chromaDB_path: str, embedding_function, batch_size: int = EMBEDDING_BATCH_SIZE, max_concurrency: int = EMBEDDING_CONCURRENCY) -> dict:
     """
     Add document chunks to the Chroma database.
 
-    :param chunks: List of Document chunks to add.
+    Chunks may be a list or any iterable, e.g. a generator fed by the parser;
+    they are embedded in batches as they arrive.
+
+    :param chunks: Document chunks to add.
     :param chromaDB_path: Path to the Chroma database.
     :param embedding_function: The embedding function to use.
+    :param batch_size: Chunks embedded in one request and written in one upsert.
+    :param max_concurrency: Embedding requests in flight at once.
+    :return: The statistics of upsert_chunks.
     """
-    db = Chroma(persist_directory=chromaDB_path, embedding_function=embedding_function)
-    chunks_with_ids = calculate_chunk_ids(chunks)
+    collection = open_collection(chromaDB_path)
 
     # Log existing documents
-    existing_items = db.get(include=[])  # IDs are always included by default
+    existing_items = collection.get(include=[])  # IDs are always included by default
     existing_ids = set(existing_items["ids"])
     logging.info(f"Number of existing documents in DB: {len(existing_ids)}")
 
-    # Log new chunks
-    new_chunks = [chunk for chunk in chunks_with_ids if chunk.metadata["id"] not in existing_ids]
-    logging.info(f"Number of new chunks to add: {len(new_chunks)}")
-    if new_chunks:
-        logging.info("Adding new documents...")
-        with tqdm(total=len(new_chunks), desc="Adding new documents") as pbar:
-            for chunk in new_chunks:
-                db.add_documents([chunk], ids=[chunk.metadata["id"]])
-                pbar.update(1)
+    new_chunks = (chunk for chunk in assign_chunk_ids(chunks) if chunk.metadata["id"] not in existing_ids)
+    logging.info("Adding new documents...")
+    stats = upsert_chunks(collection, new_chunks, embedding_function, batch_size, max_concurrency)
+    if stats["chunks"]:
         logging.info("Persisting changes to the database.")
     else:
         logging.info("No new documents to add.")
+    return stats
+
+def open_collection(chromaDB_path: str):
+    """
+    Open the chromadb collection behind the Chroma store at `chromaDB_path`.
+
+    The client is created with the same settings langchain_chroma uses for a
+    persistent store, so both share one chromadb system for the directory.
+
+    :param chromaDB_path: Path to the Chroma database.
+    :return: The chromadb collection.
+    """
+    client = chromadb.Client(chromadb.config.Settings(is_persistent=True, persist_directory=chromaDB_path))
+    # Embeddings are always passed in, so no default embedding function is needed
+    return client.get_or_create_collection(CHROMA_COLLECTION, embedding_function=None)
+
+def batched(items, size: int):
+    """
+    Yield lists of up to `size` items from any iterable.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def upsert_chunks(collection, chunks, embedding_function, batch_size: int = EMBEDDING_BATCH_SIZE, max_concurrency: int = EMBEDDING_CONCURRENCY, total: int = None) -> dict:
+    """
+    Embed chunks in batches and write each batch with a single upsert.
+
+    Up to `max_concurrency` batches are embedded concurrently on a thread pool,
+    while finished batches are written to Chroma in order from this thread.
+
+    :param collection: The chromadb collection to write to, see open_collection.
+    :param chunks: Iterable of Document chunks with an "id" in their metadata.
+    :param embedding_function: The embedding function to use.
+    :param batch_size: Chunks embedded in one request and written in one upsert.
+    :param max_concurrency: Embedding requests in flight at once.
+    :param total: Number of chunks, for the progress bar, if known.
+    :return: Chunks and estimated tokens written, elapsed seconds and rates.
+    """
+    if total is None and hasattr(chunks, "__len__"):
+        total = len(chunks)
+    batch_size = max(1, batch_size)
+    max_concurrency = max(1, max_concurrency)
+    written_chunks = 0
+    written_tokens = 0
+    start = time.perf_counter()
+
+    def embed(batch):
+        return embedding_function.embed_documents([chunk.page_content for chunk in batch])
+
+    def write(batch, embeddings):
+        collection.upsert(
+            ids=[chunk.metadata["id"] for chunk in batch],
+            embeddings=embeddings,
+            metadatas=[chunk.metadata for chunk in batch],
+            documents=[chunk.page_content for chunk in batch],
+        )
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed") as executor, \
+            tqdm(total=total, desc="Adding new documents", unit="chunk") as pbar:
+        pending = deque()
+
+        def write_oldest():
+            nonlocal written_chunks, written_tokens
+            batch, future = pending.popleft()
+            write(batch, future.result())
+            written_chunks += len(batch)
+            written_tokens += sum(len(chunk.page_content) for chunk in batch) // CHARS_PER_TOKEN
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            pbar.update(len(batch))
+            pbar.set_postfix(chunks_s=f"{written_chunks / elapsed:.1f}", tokens_s=f"{written_tokens / elapsed:.0f}")
+
+        for batch in batched(chunks, batch_size):
+            # Bounds the requests in flight (and the embedded batches held in memory)
+            while len(pending) >= max_concurrency:
+                write_oldest()
+            pending.append((batch, executor.submit(embed, batch)))
+        while pending:
+            write_oldest()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "chunks": written_chunks,
+        "tokens": written_tokens,
+        "seconds": elapsed,
+        "chunks_per_second": written_chunks / elapsed if elapsed else 0.0,
+        "tokens_per_second": written_tokens / elapsed if elapsed else 0.0,
+    }
+    logging.info(
+        f"Embedded and stored {written_chunks} chunks (~{written_tokens} tokens) in {elapsed:.2f}s: "
+        f"{stats['chunks_per_second']:.1f} chunks/s, ~{stats['tokens_per_second']:.0f} tokens/s"
+    )
+    return stats
 
 def calculate_chunk_ids(chunks: list[Document]):
     """
     Calculate unique IDs for document chunks based on their source and page information.
     """
+    return list(assign_chunk_ids(chunks))
+
+def assign_chunk_ids(chunks):
+    """
+    Set the "id" of each chunk ("source:page:index") and yield it, so IDs can be
+    assigned while chunks stream through. Chunks of a page must be consecutive.
+    """
     last_page_id = None
     current_chunk_index = 0
     for chunk in chunks:
@@ -177,8 +517,7 @@ def calculate_chunk_ids(chunks: list[Document]):
         chunk_id = f"{current_page_id}:{current_chunk_index}"
         last_page_id = current_page_id
         chunk.metadata["id"] = chunk_id
-
-    return chunks
+        yield chunk
 
 def clear_database(chromaDB_path: str):
     """
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+SQLITE_MAX_VARIABLES = 900  # Stay below SQLite's default limit of bound parameters
+QUERY_SUFFIX = "#query"  # Queries are cached apart from documents of the same model
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different chunks share an entry."""
+    return " ".join(text.split())
+
+def text_hash(text: str) -> bytes:
+    """Returns the cache key of a text, after normalization."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+class EmbeddingCache:
+    """
+    Persistent store of embedding vectors in SQLite, keyed by (model, text hash).
+
+    Vectors are stored as float32 blobs. Every lookup updates `last_used`, so
+    compaction can drop entries that have not been needed for a while.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite database file, created if missing.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    hash BLOB NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, hash)
+                ) WITHOUT ROWID"""
+            )
+
+    def get_many(self, model: str, hashes: List[bytes]) -> Dict[bytes, List[float]]:
+        """
+        Looks up vectors by text hash.
+
+        Returns:
+            Dict[bytes, List[float]]: The vectors found, by hash.
+        """
+        found = {}
+        now = time.time()
+        with self.lock, self.connection:
+            for start in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                keys = hashes[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(keys))
+                rows = self.connection.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *keys],
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+                if rows:
+                    self.connection.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND hash IN ({','.join('?' * len(rows))})",
+                        [now, model, *(key for key, _ in rows)],
+                    )
+            unique = len(set(hashes))
+            self.hits += len(found)
+            self.misses += unique - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[bytes, List[float]]):
+        """Stores vectors by text hash, replacing existing entries."""
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((model, key, array.size, array.tobytes(), now))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters of this process and the entries per model."""
+        with self.lock:
+            models = {
+                model: {"entries": entries, "dim": dim, "mb": size / (1024 * 1024)}
+                for model, entries, dim, size in self.connection.execute(
+                    "SELECT model, COUNT(*), MAX(dim), SUM(LENGTH(vector)) FROM embeddings GROUP BY model"
+                )
+            }
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "file_mb": os.path.getsize(self.path) / (1024 * 1024) if os.path.exists(self.path) else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "models": models,
+        }
+
+    def compact(self, max_age_days: Optional[float] = None, max_entries: Optional[int] = None, keep_models: Optional[List[str]] = None) -> int:
+        """
+        Deletes old entries and rewrites the file to reclaim space.
+
+        Args:
+            max_age_days (float, optional): Drop entries unused for longer than this.
+            max_entries (int, optional): Keep only the most recently used entries.
+            keep_models (List[str], optional): Drop entries of every other model (their
+                query entries are kept too).
+
+        Returns:
+            int: Number of entries deleted.
+        """
+        deleted = 0
+        with self.lock:
+            with self.connection:
+                if keep_models:
+                    keep_models = [*keep_models, *(model + QUERY_SUFFIX for model in keep_models)]
+                    placeholders = ",".join("?" * len(keep_models))
+                    deleted += self.connection.execute(
+                        f"DELETE FROM embeddings WHERE model NOT IN ({placeholders})", keep_models
+                    ).rowcount
+                if max_age_days is not None:
+                    deleted += self.connection.execute(
+                        "DELETE FROM embeddings WHERE last_used < ?", (time.time() - max_age_days * 86400,)
+                    ).rowcount
+                if max_entries is not None:
+                    deleted += self.connection.execute(
+                        "DELETE FROM embeddings WHERE (model, hash) NOT IN "
+                        "(SELECT model, hash FROM embeddings ORDER BY last_used DESC LIMIT ?)",
+                        (max_entries,),
+                    ).rowcount
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.connection.execute("VACUUM")
+        logging.info(f"Embedding cache compacted: {deleted} entries deleted from {self.path}")
+        return deleted
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache and only
+    sends the missing ones to the wrapped embedding service.
+
+    Documents and queries are cached under separate keys, since some services embed
+    them differently.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        """
+        Args:
+            embeddings (Embeddings): The embedding service to wrap.
+            cache (EmbeddingCache): Where vectors are stored.
+            model (str): Identifies the service and model, e.g. "ollama:nomic-embed-text".
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    def _embed(self, texts: List[str], model: str, embed) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(model, hashes)
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if missing:
+            embedded = dict(zip(missing, embed(list(missing.values()))))
+            self.cache.put_many(model, embedded)
+            vectors.update(embedded)
+        return [list(vectors[key]) for key in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.model, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], self.model + QUERY_SUFFIX, lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact an embedding cache.")
+    parser.add_argument("path", help="SQLite file of the cache, e.g. conversations/GLaDOS/embedding_cache.sqlite")
+    parser.add_argument("--compact", action="store_true", help="Delete old entries and reclaim space")
+    parser.add_argument("--max-age-days", type=float, help="With --compact: drop entries unused for this many days")
+    parser.add_argument("--max-entries", type=int, help="With --compact: keep only the most recently used entries")
+    parser.add_argument("--keep-model", action="append", help="With --compact: drop entries of other models (repeatable)")
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.path)
+    if args.compact:
+        cache.compact(max_age_days=args.max_age_days, max_entries=args.max_entries, keep_models=args.keep_model)
+    stats = cache.stats()
+    print(f"{stats['path']}: {stats['file_mb']:.1f} MB")
+    for model, info in stats["models"].items():
+        print(f"  {model}: {info['entries']} entries, dim {info['dim']}, {info['mb']:.1f} MB")
+    cache.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,196 @@
+import importlib.util
+import logging
+import os
+import threading
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import httpx
+import requests
+from ollama import AsyncClient, Client
+from requests.adapters import HTTPAdapter
+
+REQUESTS_TIMEOUT = (5, 30)  # (connect, read) seconds for tool calls to web APIs
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool and timeout settings shared by every pooled client"""
+
+    max_connections: int = 16
+    """Open connections per client, in use or idle"""
+
+    max_keepalive: int = 8
+    """Idle connections kept open for reuse"""
+
+    keepalive_expiry: float = 300.0
+    """Seconds an idle connection is kept before being closed"""
+
+    connect_timeout: float = 5.0
+    """Seconds to wait for the TCP/TLS connection"""
+
+    read_timeout: Optional[float] = None
+    """Seconds to wait for data, None since model loads and long generations can stall a stream"""
+
+    http2: bool = False
+    """Negotiate HTTP/2 when the server supports it (needs the h2 package)"""
+
+def _env(setting: str) -> Optional[str]:
+    return os.environ.get(f"HTTP_{setting}")
+
+def resolve_settings() -> PoolSettings:
+    """
+    Returns the pool settings, applying environment overrides.
+
+    `HTTP_MAX_CONNECTIONS`, `HTTP_MAX_KEEPALIVE`, `HTTP_KEEPALIVE_EXPIRY`,
+    `HTTP_CONNECT_TIMEOUT`, `HTTP_READ_TIMEOUT` and `HTTP_HTTP2` override single
+    settings, e.g. HTTP_MAX_CONNECTIONS=32.
+
+    Returns:
+        PoolSettings: The settings to build the clients with.
+    """
+    overrides = {}
+    if _env("MAX_CONNECTIONS"):
+        overrides["max_connections"] = int(_env("MAX_CONNECTIONS"))
+    if _env("MAX_KEEPALIVE"):
+        overrides["max_keepalive"] = int(_env("MAX_KEEPALIVE"))
+    if _env("KEEPALIVE_EXPIRY"):
+        overrides["keepalive_expiry"] = float(_env("KEEPALIVE_EXPIRY"))
+    if _env("CONNECT_TIMEOUT"):
+        overrides["connect_timeout"] = float(_env("CONNECT_TIMEOUT"))
+    if _env("READ_TIMEOUT"):
+        overrides["read_timeout"] = float(_env("READ_TIMEOUT"))
+    if _env("HTTP2"):
+        overrides["http2"] = _env("HTTP2").strip().lower() in ("1", "true", "yes", "on")
+    settings = replace(PoolSettings(), **overrides)
+    if settings.http2 and importlib.util.find_spec("h2") is None:
+        logging.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+        settings = replace(settings, http2=False)
+    return settings
+
+def httpx_kwargs(settings: Optional[PoolSettings] = None) -> dict:
+    """
+    Keyword arguments for an httpx client (or an ollama client, which forwards them).
+
+    Args:
+        settings (PoolSettings, optional): Defaults to resolve_settings().
+
+    Returns:
+        dict: `limits`, `timeout` and `http2`.
+    """
+    settings = settings or resolve_settings()
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout),
+        "http2": settings.http2,
+    }
+
+def httpx_transport(asynchronous: bool = False, settings: Optional[PoolSettings] = None):
+    """
+    Builds the connection pool of an httpx client as a transport we own, so it can
+    be closed through httpx's public API whatever client wraps it.
+
+    Args:
+        asynchronous (bool): Build an AsyncHTTPTransport instead of an HTTPTransport.
+        settings (PoolSettings, optional): Defaults to resolve_settings().
+
+    Returns:
+        httpx.HTTPTransport | httpx.AsyncHTTPTransport: The pooled transport.
+    """
+    settings = settings or resolve_settings()
+    transport = httpx.AsyncHTTPTransport if asynchronous else httpx.HTTPTransport
+    return transport(limits=httpx_kwargs(settings)["limits"], http2=settings.http2)
+
+_clients = {}
+_closers = {}  # The transport or session to close for each pooled client
+_lock = threading.Lock()
+
+def _host_key(host: Optional[str]) -> str:
+    return host or os.getenv("OLLAMA_HOST") or ""
+
+def _get_or_create(kind: str, host: Optional[str], factory):
+    key = (kind, _host_key(host))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client, closer = factory()
+            _clients[key] = client
+            _closers[key] = closer
+            logging.info(f"HTTP client pool created: {kind} {key[1] or 'default host'}")
+        return client
+
+def get_ollama_client(host: Optional[str] = None) -> Client:
+    """
+    Returns the process-wide synchronous Ollama client for a host.
+
+    Args:
+        host (str, optional): Ollama server, None for OLLAMA_HOST or localhost.
+
+    Returns:
+        Client: A client whose keep-alive connection pool is shared by every caller.
+    """
+    def create():
+        settings = resolve_settings()
+        transport = httpx_transport(False, settings)
+        return Client(host=host, transport=transport, timeout=httpx_kwargs(settings)["timeout"]), transport
+    return _get_or_create("ollama", host, create)
+
+def get_ollama_async_client(host: Optional[str] = None) -> AsyncClient:
+    """
+    Returns the process-wide asynchronous Ollama client for a host.
+
+    The connections of an async client belong to the event loop that opened them,
+    so the shared client must only be used from the application loop.
+
+    Args:
+        host (str, optional): Ollama server, None for OLLAMA_HOST or localhost.
+
+    Returns:
+        AsyncClient: A client whose keep-alive connection pool is shared by every caller.
+    """
+    def create():
+        settings = resolve_settings()
+        transport = httpx_transport(True, settings)
+        return AsyncClient(host=host, transport=transport, timeout=httpx_kwargs(settings)["timeout"]), transport
+    return _get_or_create("ollama_async", host, create)
+
+def ollama_client_kwargs() -> dict:
+    """
+    Pool settings for clients built by third-party wrappers, e.g. the `client_kwargs`
+    of langchain's OllamaEmbeddings.
+
+    Returns:
+        dict: Keyword arguments forwarded to the ollama clients.
+    """
+    return httpx_kwargs()
+
+def get_requests_session() -> requests.Session:
+    """
+    Returns the process-wide requests.Session used by tools to call web APIs.
+
+    Returns:
+        requests.Session: A session with a pooled adapter for http and https.
+    """
+    def create():
+        settings = resolve_settings()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.max_keepalive, pool_maxsize=settings.max_connections)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session, session
+    return _get_or_create("requests", None, create)
+
+async def close_clients():
+    """Closes every pooled client and forgets it, e.g. on shutdown."""
+    with _lock:
+        closers = list(_closers.values())
+        _clients.clear()
+        _closers.clear()
+    for closer in closers:
+        if isinstance(closer, httpx.AsyncBaseTransport):
+            await closer.aclose()
+        else:
+            closer.close()
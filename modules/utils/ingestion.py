@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from modules.utils.db_utils import update_db, list_source_files, MANIFEST_FILE, SKIPPED_DIRS
+
+try:
+    from watchfiles import watch
+except ImportError:
+    watch = None
+
+POLL_INTERVAL = 5.0  # Seconds between scans when watchfiles is not available
+DEBOUNCE_MS = 1500  # Quiet time after a change before ingesting, so copies can finish
+INGESTION_WORKERS = 2  # Processes parsing PDF pages during an update
+
+class IngestionService:
+    """
+    Keeps a character's RAG index up to date in the background.
+
+    A watcher thread follows the character folder (PDFs/ and, optionally, the JSON
+    files) with watchfiles, or by polling when it is not installed, and asks for an
+    update whenever something relevant changes. A single ingestion thread runs the
+    incremental update_db, so parsing, embedding and upserts never block the
+    conversation; requests that arrive during an update are coalesced into one
+    follow-up update.
+    """
+
+    def __init__(self, data_path: str, embedding_function, include_json: bool = True, workers: int = INGESTION_WORKERS, poll_interval: float = POLL_INTERVAL):
+        """
+        Args:
+            data_path (str): Character folder, with PDFs under PDFs/.
+            embedding_function: The embedding function used for new chunks.
+            include_json (bool): Also index the JSON files of the folder.
+            workers (int): Processes parsing PDF pages during an update.
+            poll_interval (float): Seconds between scans when polling.
+        """
+        self.data_path = data_path
+        self.embedding_function = embedding_function
+        self.include_json = include_json
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.requested = threading.Event()
+        self.lock = threading.Lock()
+        self.threads = []
+        self._status = {
+            "state": "stopped",
+            "watcher": "watchfiles" if watch is not None else "polling",
+            "pending": False,
+            "updates": 0,
+            "last_update": None,
+            "last_duration": None,
+            "last_result": None,
+            "last_error": None,
+        }
+
+    def start(self):
+        """Starts the watcher and the ingestion thread, with an initial update."""
+        if self.threads:
+            return
+        self.stop_event.clear()
+        self._set_status(state="idle")
+        self.threads = [
+            threading.Thread(target=self._ingest_loop, name="rag_ingestion", daemon=True),
+            threading.Thread(target=self._watch_loop, name="rag_watcher", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        self.request_update()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops both threads; an update in progress finishes first."""
+        self.stop_event.set()
+        self.requested.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        self._set_status(state="stopped")
+
+    def request_update(self):
+        """Asks for an incremental update, e.g. after adding files by hand."""
+        self._set_status(pending=True)
+        self.requested.set()
+
+    def status(self) -> dict:
+        """
+        Returns the current state (idle, updating or stopped), the watcher in use,
+        whether an update is pending and the time, duration, result and error of
+        the last update.
+        """
+        with self.lock:
+            return dict(self._status)
+
+    def _set_status(self, **values):
+        with self.lock:
+            self._status.update(values)
+
+    def _ingest_loop(self):
+        while not self.stop_event.is_set():
+            self.requested.wait()
+            if self.stop_event.is_set():
+                break
+            self.requested.clear()
+            self._set_status(state="updating", pending=False)
+            start = time.perf_counter()
+            try:
+                result = update_db(self.data_path, self.embedding_function, include_json=self.include_json, max_workers=self.workers)
+                self._set_status(last_result=result, last_error=None)
+            except Exception as e:
+                logging.error(f"RAG ingestion failed: {e}")
+                self._set_status(last_error=str(e))
+            with self.lock:
+                self._status.update(
+                    state="idle",
+                    updates=self._status["updates"] + 1,
+                    last_update=time.time(),
+                    last_duration=time.perf_counter() - start,
+                )
+
+    def _is_relevant(self, path: str) -> bool:
+        relative = os.path.relpath(path, self.data_path)
+        parts = relative.split(os.sep)
+        if parts[0] in SKIPPED_DIRS or os.path.basename(path).startswith(MANIFEST_FILE):
+            return False
+        if path.lower().endswith(".pdf"):
+            return parts[0] == "PDFs"
+        return self.include_json and path.lower().endswith(".json")
+
+    def _watch_loop(self):
+        if watch is not None:
+            try:
+                for changes in watch(self.data_path, stop_event=self.stop_event, debounce=DEBOUNCE_MS, recursive=True):
+                    if any(self._is_relevant(path) for _, path in changes):
+                        self.request_update()
+                return
+            except Exception as e:
+                logging.warning(f"File watching failed, falling back to polling: {e}")
+                self._set_status(watcher="polling")
+        self._poll_loop()
+
+    def _poll_loop(self):
+        snapshot = self._snapshot()
+        while not self.stop_event.wait(self.poll_interval):
+            current = self._snapshot()
+            if current != snapshot:
+                snapshot = current
+                self.request_update()
+
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        for path in list_source_files(self.data_path, self.include_json):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
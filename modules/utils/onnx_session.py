@@ -0,0 +1,148 @@
+import logging
+import os
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+import onnxruntime as ort
+
+CPU_COUNT = os.cpu_count() or 1
+OPTIMIZED_SUFFIX = ".optimized.onnx"
+
+GRAPH_OPTIMIZATION = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+@dataclass(frozen=True)
+class SessionProfile:
+    """Threading, optimization and memory settings of an InferenceSession"""
+
+    intra_op_threads: int = 0
+    """Threads used inside one operator, 0 lets ONNX Runtime decide"""
+
+    inter_op_threads: int = 0
+    """Threads running independent operators, only used in parallel mode"""
+
+    parallel: bool = False
+    """Run independent graph branches in parallel (ORT_PARALLEL)"""
+
+    optimization: str = "all"
+    """Graph optimization level: disabled, basic, extended or all"""
+
+    cpu_mem_arena: bool = True
+    """Keep freed CPU buffers in an arena for reuse"""
+
+    mem_pattern: bool = True
+    """Preallocate from the memory pattern of previous runs (best with fixed input shapes)"""
+
+    allow_spinning: bool = True
+    """Let idle intra-op threads busy-wait for work instead of sleeping"""
+
+    cpu_affinity: Optional[str] = None
+    """Intra-op thread affinities, e.g. "1;2" or "1-2;3-4" (one entry per extra thread)"""
+
+    save_optimized: bool = False
+    """Save the optimized graph next to the model and load it directly next time"""
+
+SESSION_PROFILES = {
+    # ONNX Runtime defaults
+    "default": SessionProfile(),
+    # One request at a time, as fast as possible, leaving a core for audio and the VAD
+    "latency": SessionProfile(intra_op_threads=max(1, CPU_COUNT - 2), save_optimized=True),
+    # Batched synthesis: every core but two, left to audio and the VAD, with threads that sleep when idle
+    "throughput": SessionProfile(intra_op_threads=max(1, CPU_COUNT - 2), allow_spinning=False, save_optimized=True),
+    # Tiny models on a hot path (VAD): one thread that sleeps between calls
+    "light": SessionProfile(intra_op_threads=1, inter_op_threads=1, allow_spinning=False),
+}
+
+def _env(name: str, setting: str) -> Optional[str]:
+    return os.environ.get(f"ONNX_{name.upper()}_{setting}")
+
+def _env_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def resolve_profile(name: str, profile: str) -> SessionProfile:
+    """
+    Returns the profile for a model, applying environment overrides.
+
+    `ONNX_<NAME>_PROFILE` picks another profile, and `ONNX_<NAME>_INTRA_OP_THREADS`,
+    `_INTER_OP_THREADS`, `_OPTIMIZATION`, `_AFFINITY` and `_SAVE_OPTIMIZED` override
+    single settings, e.g. ONNX_VAD_INTRA_OP_THREADS=2.
+
+    Args:
+        name (str): Model name used in the environment variables (TTS, VAD, ...).
+        profile (str): Profile used when the environment does not choose one.
+
+    Returns:
+        SessionProfile: The settings to build the session with.
+    """
+    profile = _env(name, "PROFILE") or profile
+    if profile not in SESSION_PROFILES:
+        raise ValueError(f"Unknown ONNX session profile: {profile}")
+    settings = SESSION_PROFILES[profile]
+
+    overrides = {}
+    if _env(name, "INTRA_OP_THREADS"):
+        overrides["intra_op_threads"] = int(_env(name, "INTRA_OP_THREADS"))
+    if _env(name, "INTER_OP_THREADS"):
+        overrides["inter_op_threads"] = int(_env(name, "INTER_OP_THREADS"))
+    if _env(name, "OPTIMIZATION"):
+        overrides["optimization"] = _env(name, "OPTIMIZATION").lower()
+    if _env(name, "AFFINITY"):
+        overrides["cpu_affinity"] = _env(name, "AFFINITY")
+    if _env(name, "SAVE_OPTIMIZED"):
+        overrides["save_optimized"] = _env_bool(_env(name, "SAVE_OPTIMIZED"))
+    if overrides.get("optimization", settings.optimization) not in GRAPH_OPTIMIZATION:
+        raise ValueError(f"Unknown graph optimization level: {overrides['optimization']}")
+    return replace(settings, **overrides)
+
+def create_session(model_path: str, name: str, profile: str = "default", providers: Optional[List] = None) -> ort.InferenceSession:
+    """
+    Creates an InferenceSession tuned by a named profile.
+
+    The optimized graph is only saved for CPU-only sessions, since graphs
+    optimized at the extended/all levels can contain provider-specific nodes.
+
+    Args:
+        model_path (str): Path of the .onnx model.
+        name (str): Model name used for logs and environment overrides.
+        profile (str): Default profile name, see SESSION_PROFILES.
+        providers (list, optional): Execution providers, CPU only by default.
+
+    Returns:
+        ort.InferenceSession: The configured session.
+    """
+    providers = providers or ["CPUExecutionProvider"]
+    settings = resolve_profile(name, profile)
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = settings.intra_op_threads
+    options.inter_op_num_threads = settings.inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_PARALLEL if settings.parallel else ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = GRAPH_OPTIMIZATION[settings.optimization]
+    options.enable_cpu_mem_arena = settings.cpu_mem_arena
+    options.enable_mem_pattern = settings.mem_pattern
+    options.add_session_config_entry("session.intra_op.allow_spinning", "1" if settings.allow_spinning else "0")
+    if settings.cpu_affinity:
+        options.add_session_config_entry("session.intra_op_thread_affinities", settings.cpu_affinity)
+
+    load_path = str(model_path)
+    cpu_only = all(
+        (provider[0] if isinstance(provider, tuple) else provider) == "CPUExecutionProvider"
+        for provider in providers
+    )
+    if settings.save_optimized and cpu_only:
+        optimized_path = str(model_path) + OPTIMIZED_SUFFIX
+        if os.path.exists(optimized_path) and os.path.getmtime(optimized_path) >= os.path.getmtime(model_path):
+            load_path = optimized_path
+            options.graph_optimization_level = GRAPH_OPTIMIZATION["disabled"]
+        else:
+            options.optimized_model_filepath = optimized_path
+
+    logging.info(
+        f"ONNX session {name}: profile={_env(name, 'PROFILE') or profile} {settings} "
+        f"providers={providers} model={load_path}"
+    )
+    return ort.InferenceSession(load_path, sess_options=options, providers=providers)
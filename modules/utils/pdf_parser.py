@@ -0,0 +1,91 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Set, Tuple
+
+from pypdf import PdfReader
+
+# This module only depends on pypdf, so the worker processes (spawned on Windows)
+# import it quickly without pulling in langchain or Chroma.
+
+PAGES_PER_TASK = 16  # Pages parsed by one worker task
+MIN_PARALLEL_PAGES = 2 * PAGES_PER_TASK  # Below this, parsing in-process beats starting a pool
+
+def count_pages(path: str) -> int:
+    """Returns the number of pages of a PDF."""
+    return len(PdfReader(path).pages)
+
+def parse_pages(path: str, start: int, stop: int) -> List[str]:
+    """
+    Extracts the text of pages [start, stop) of a PDF, like PyPDFLoader does.
+
+    Runs in a worker process, so it only receives and returns plain data.
+    """
+    reader = PdfReader(path)
+    return [reader.pages[number].extract_text() for number in range(start, stop)]
+
+def iter_pdf_pages(paths: List[str], max_workers: Optional[int] = None, failed: Optional[Set[str]] = None) -> Iterator[Tuple[str, int, str]]:
+    """
+    Parses PDFs in parallel, page ranges at a time, on a process pool.
+
+    Pages are yielded in file and page order as soon as they are ready, with a
+    bounded number of tasks in flight, so the whole corpus is never held in memory.
+
+    Args:
+        paths (List[str]): PDF files to parse.
+        max_workers (int, optional): Worker processes, defaults to the CPU count.
+        failed (Set[str], optional): Receives the paths that could not be parsed;
+            their remaining pages are skipped.
+
+    Yields:
+        Tuple[str, int, str]: (path, page number from 0, page text).
+    """
+    failed = failed if failed is not None else set()
+    tasks = []
+    for path in paths:
+        try:
+            pages = count_pages(path)
+        except Exception as e:
+            logging.error(f"Failed to open PDF document {path}: {e}")
+            failed.add(path)
+            continue
+        tasks.extend((path, start, min(start + PAGES_PER_TASK, pages)) for start in range(0, pages, PAGES_PER_TASK))
+
+    total_pages = sum(stop - start for _, start, stop in tasks)
+    max_workers = max(1, max_workers or os.cpu_count() or 1)
+    if max_workers == 1 or total_pages < MIN_PARALLEL_PAGES:
+        for path, start, stop in tasks:
+            if path in failed:
+                continue
+            try:
+                texts = parse_pages(path, start, stop)
+            except Exception as e:
+                logging.error(f"Failed to parse PDF document {path}: {e}")
+                failed.add(path)
+                continue
+            for offset, text in enumerate(texts):
+                yield path, start + offset, text
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        next_task = 0
+        while next_task < len(tasks) or pending:
+            # Keeps every worker busy with one task queued behind it
+            while next_task < len(tasks) and len(pending) < 2 * max_workers:
+                path, start, stop = tasks[next_task]
+                pending.append((path, start, executor.submit(parse_pages, path, start, stop)))
+                next_task += 1
+            path, start, future = pending.popleft()
+            try:
+                texts = future.result()
+            except Exception as e:
+                if path not in failed:
+                    logging.error(f"Failed to parse PDF document {path}: {e}")
+                failed.add(path)
+                continue
+            if path in failed:
+                continue
+            for offset, text in enumerate(texts):
+                yield path, start + offset, text